@@ -1,11 +1,25 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
 from nfl_data import NFLData
 from nba_data import NBAData
+import devig
+import pricing_math
+import pricing_log
+from pricing_log import logger
+from odds_layout import CATEGORICAL_COLUMNS, OddsDictionary, widen
 
 class Game:
-    def __init__(self, id, sport_key, sport_title, commence_time, home_team, away_team, bookmakers, markets, bookmaker_keys, sport_data: NFLData | NBAData = None):
+    """
+    One event's odds and metadata.
+
+    Only the raw bookmakers payload is kept at construction; the devigged odds_df (with
+    the DFS price override applied) is built on first access, so games that are skipped
+    (e.g. unchanged since their last pricing) never pay for it.
+    """
+    __slots__ = ('id', 'sport_key', 'sport_title', 'commence_time', 'home_team', 'away_team', 'bookmakers',
+                 'markets', 'bookmaker_keys', 'sport_data', 'devig_method', 'odds_dictionary', '_odds_df')
+
+    def __init__(self, id, sport_key, sport_title, commence_time, home_team, away_team, bookmakers, markets, bookmaker_keys, sport_data: NFLData | NBAData = None, devig_method: str = None, odds_dictionary: OddsDictionary = None):
         self.id = id
         self.sport_key = sport_key
         self.sport_title = sport_title
@@ -16,43 +30,85 @@ class Game:
         self.markets = markets
         self.bookmaker_keys = bookmaker_keys
         self.sport_data = sport_data
+        self.devig_method = devig_method or devig.DEVIG_METHOD
+        self.odds_dictionary = odds_dictionary
+        self._odds_df = None
 
-        self.odds_df = self._odds_to_df(bookmakers)
-        self._devig_odds()
-        self._adjust_odds_for_betting_books(books=['prizepicks', 'underdog', 'betr_us_dfs', 'pick6'], price=1.82)
+    @property
+    def odds_df(self) -> pd.DataFrame:
+        if self._odds_df is None:
+            self._odds_df = self._odds_to_df(self.bookmakers)
+            self._devig_odds()
+            self._adjust_odds_for_betting_books(books=['prizepicks', 'underdog', 'betr_us_dfs', 'pick6'], price=1.82)
+        return self._odds_df
+
+    @odds_df.setter
+    def odds_df(self, odds_df: pd.DataFrame) -> None:
+        self._odds_df = odds_df
     
     def _odds_to_df(self, bookmakers):
-        rows = []
+        """
+        Decode the bookmakers/markets/outcomes tree straight into typed columns.
+        
+        Walks the payload once, filling preallocated arrays a market at a time. Bookmaker,
+        market, player and outcome strings are interned into integer codes and returned
+        as categoricals, so no per-row dicts or repeated string objects are created.
+        With an odds_dictionary the categoricals use the slate's shared dictionary.
+        Lines and prices are float32 and last_update is parsed to datetime64.
+        """
+        size = sum(len(market['outcomes']) for bookmaker in bookmakers for market in bookmaker['markets'])
+        
+        dictionaries = {column: {} for column in ('bookmaker', 'market', 'player', 'outcome')}
+        codes = {column: np.empty(size, dtype=np.int32) for column in dictionaries}
+        lines = np.empty(size, dtype=np.float32)
+        prices = np.empty(size, dtype=np.float32)
+        update_codes = np.empty(size, dtype=np.int32)
+        updates = {}
+        
+        books, markets, players, names = (dictionaries[c] for c in ('bookmaker', 'market', 'player', 'outcome'))
+        start = 0
         for bookmaker in bookmakers:
+            book_code = books.setdefault(bookmaker['key'], len(books))
             for market in bookmaker['markets']:
-                for outcome in market['outcomes']:
-                    rows.append({
-                        'bookmaker': bookmaker['key'],
-                        'market': market['key'],
-                        'player': outcome['description'],
-                        'outcome': outcome['name'],
-                        'line': outcome['point'],
-                        'price': outcome['price'],
-                        'last_update': market['last_update']
-                    })
-        return pd.DataFrame(rows)
+                outcomes = market['outcomes']
+                end = start + len(outcomes)
+                codes['bookmaker'][start:end] = book_code
+                codes['market'][start:end] = markets.setdefault(market['key'], len(markets))
+                codes['player'][start:end] = [players.setdefault(o['description'], len(players)) for o in outcomes]
+                codes['outcome'][start:end] = [names.setdefault(o['name'], len(names)) for o in outcomes]
+                lines[start:end] = [o['point'] for o in outcomes]
+                prices[start:end] = [o['price'] for o in outcomes]
+                update_codes[start:end] = updates.setdefault(market['last_update'], len(updates))
+                start = end
+        
+        columns = {}
+        for column in CATEGORICAL_COLUMNS:
+            if self.odds_dictionary is None:
+                columns[column] = pd.Categorical.from_codes(codes[column], categories=list(dictionaries[column]))
+            else:
+                columns[column] = self.odds_dictionary.categorical(column, list(dictionaries[column]), codes[column])
+        columns['line'] = lines
+        columns['price'] = prices
+        # Markets share a handful of timestamps; parse each once
+        columns['last_update'] = pd.to_datetime(list(updates), utc=True, format='ISO8601')[update_codes] if size else pd.to_datetime([], utc=True)
+        return pd.DataFrame(columns)
     
     def _devig_odds(self):
         """
-        Update odds_df to add column for devigged price and probability with multiplicative method
-        """
-        self.odds_df['implied_prob'] = 1 / self.odds_df['price']
-        
-        grouped = self.odds_df.groupby(['bookmaker', 'market', 'player', 'line'])
+        Update odds_df to add columns for devigged price and probability
 
-        self.odds_df['total_prob'] = grouped['implied_prob'].transform('sum')
-        self.odds_df['devigged_prob'] = self.odds_df['implied_prob'] / self.odds_df['total_prob']
-        self.odds_df['devigged_price'] = 1 / self.odds_df['devigged_prob']
-        self.odds_df.drop(columns=['implied_prob', 'total_prob'], inplace=True)
+        Each bookmaker/market/player/line is one market; see devig.devig for the methods.
+        """
+        ids, group_count = devig.group_ids(
+            self.odds_df['bookmaker'], self.odds_df['market'], self.odds_df['player'], self.odds_df['line']
+        )
+        devigged_prob = devig.devig(widen(self.odds_df['price'].to_numpy()), ids, group_count, self.devig_method)
+        self.odds_df['devigged_prob'] = devigged_prob
+        self.odds_df['devigged_price'] = 1 / devigged_prob
     
     def _adjust_odds_for_betting_books(self, books: list[str], price: float = 1.82) -> None:
         mask = self.odds_df['bookmaker'].isin(books)
-        self.odds_df.loc[mask, 'price'] = price
+        self.odds_df.loc[mask, 'price'] = np.float32(price)
 
     def _get_std_dev_batch(self, player_market_pairs: pd.DataFrame) -> dict:
         """
@@ -62,34 +118,23 @@ class Game:
         cache = {}
         unique_pairs = player_market_pairs[['player', 'market']].drop_duplicates()
         
-        failed_lookups = []
-        low_sample_size = []
-        
-        for _, row in unique_pairs.iterrows():
-            key = (row['player'], row['market'])
+        for key in zip(unique_pairs['player'], unique_pairs['market']):
             if key not in cache:
-                std, sample_size = self.sport_data.get_std_dev(row['player'], row['market'])
-                cache[key] = (std, sample_size)
-                
-                # Log issues
-                if np.isnan(std) or std == 0:
-                    failed_lookups.append(f"{row['player']} - {row['market']}")
-                elif sample_size <= 1:
-                    low_sample_size.append(f"{row['player']} - {row['market']} (n={sample_size})")
-        
-        if failed_lookups:
-            print(f"WARNING: Failed to get valid std_dev for {len(failed_lookups)} player/market combinations:")
-            for item in failed_lookups[:5]:  # Show first 5
-                print(f"  - {item}")
-            if len(failed_lookups) > 5:
-                print(f"  ... and {len(failed_lookups) - 5} more")
-        
-        if low_sample_size:
-            print(f"WARNING: Low sample size for {len(low_sample_size)} player/market combinations:")
-            for item in low_sample_size[:5]:  # Show first 5
-                print(f"  - {item}")
-            if len(low_sample_size) > 5:
-                print(f"  ... and {len(low_sample_size) - 5} more")
+                cache[key] = self.sport_data.get_std_dev(*key)
+        
+        # Issues are counted in the game summary; list them only at debug level
+        if pricing_log.debug_enabled():
+            failed_lookups = [key for key, (std, _) in cache.items() if np.isnan(std) or std == 0]
+            low_sample_size = [
+                (player, market, sample_size) for (player, market), (std, sample_size) in cache.items()
+                if not (np.isnan(std) or std == 0) and sample_size <= 1
+            ]
+            if failed_lookups:
+                pricing_log.log_affected(f"Failed to get valid std_dev for {len(failed_lookups)} player/market combinations:",
+                                         *zip(*failed_lookups), limit=5)
+            if low_sample_size:
+                pricing_log.log_affected(f"Low sample size for {len(low_sample_size)} player/market combinations:",
+                                         *zip(*low_sample_size), limit=5)
         
         return cache
     
@@ -103,7 +148,7 @@ class Game:
         df.drop(columns=['_key'], inplace=True)
         return df
     
-    def _calculate_sharp_means(self, sharp_over_df: pd.DataFrame) -> pd.DataFrame:
+    def _calculate_sharp_means(self, sharp_over_df: pd.DataFrame, counters: dict) -> pd.DataFrame:
         """
         Calculate implied means from sharp book lines and aggregate per player/market.
         
@@ -114,21 +159,18 @@ class Game:
         valid_std_mask = (sharp_over_df['std_dev'] > 0) & (~sharp_over_df['std_dev'].isna())
         prob_not_half_mask = sharp_over_df['devigged_prob'] != 0.5
         
-        # Log edge cases with player names
-        invalid_std_count = (~valid_std_mask).sum()
-        prob_half_count = (~prob_not_half_mask).sum()
+        # Count edge cases; list the players only at debug level
+        invalid_std_count = int((~valid_std_mask).sum())
+        prob_half_count = int((~prob_not_half_mask).sum())
+        counters['half_prob'] += prob_half_count
         
-        if invalid_std_count > 0:
-            invalid_players = sharp_over_df[~valid_std_mask][['player', 'market']].drop_duplicates()
-            print(f"INFO: {invalid_std_count} sharp lines using fallback (line value) due to invalid std_dev")
-            print(f"      Players affected:")
-            for _, row in invalid_players.head(10).iterrows():
-                print(f"        - {row['player']} ({row['market']})")
-            if len(invalid_players) > 10:
-                print(f"        ... and {len(invalid_players) - 10} more")
+        if invalid_std_count > 0 and pricing_log.debug_enabled():
+            invalid = sharp_over_df[~valid_std_mask]
+            pricing_log.log_affected(f"{invalid_std_count} sharp lines using fallback (line value) due to invalid std_dev:",
+                                     invalid['player'], invalid['market'])
         
         if prob_half_count > 0:
-            print(f"INFO: {prob_half_count} sharp lines at exactly 50% probability (using line value)")
+            logger.debug(f"{prob_half_count} sharp lines at exactly 50% probability (using line value)")
         
         # Default to line value
         sharp_over_df['implied_mean'] = sharp_over_df['line']
@@ -138,19 +180,22 @@ class Game:
         calculated_count = calc_mask.sum()
         
         if calc_mask.any():
-            z_scores = stats.norm.ppf(1 - sharp_over_df.loc[calc_mask, 'devigged_prob'].values)
-            sharp_over_df.loc[calc_mask, 'implied_mean'] = (
-                sharp_over_df.loc[calc_mask, 'line'].values - 
-                (sharp_over_df.loc[calc_mask, 'std_dev'].values * z_scores)
+            sharp_over_df.loc[calc_mask, 'implied_mean'] = pricing_math.implied_mean(
+                sharp_over_df.loc[calc_mask, 'line'].values,
+                sharp_over_df.loc[calc_mask, 'std_dev'].values,
+                sharp_over_df.loc[calc_mask, 'devigged_prob'].values
             )
-            print(f"INFO: Calculated implied means for {calculated_count} sharp lines using Normal distribution")
+            logger.debug(f"Calculated implied means for {calculated_count} sharp lines using Normal distribution")
         
         # Aggregate sharp means per player/market with bookmaker details
-        sharp_agg = sharp_over_df.groupby(['player', 'market']).agg(
+        # Bookmakers are categorical; collect them as plain strings for the per-book details
+        sharp_over_df['_bookmaker'] = sharp_over_df['bookmaker'].astype(object)
+        sharp_agg = sharp_over_df.groupby(['player', 'market'], observed=True).agg(
             sharp_mean=('implied_mean', 'mean'),
             implied_means_list=('implied_mean', list),
-            bookmakers_list=('bookmaker', list)
+            bookmakers_list=('_bookmaker', list)
         ).reset_index()
+        sharp_over_df.drop(columns=['_bookmaker'], inplace=True)
         
         # Create implied_means column with bookmaker info
         sharp_agg['implied_means'] = sharp_agg.apply(
@@ -178,20 +223,20 @@ class Game:
             under_mask = valid_std & (merged['outcome'] == 'Under')
             
             if over_mask.any():
-                merged.loc[over_mask, 'true_prob'] = 1 - stats.norm.cdf(
+                merged.loc[over_mask, 'true_prob'] = pricing_math.over_probability(
                     merged.loc[over_mask, 'line'].values,
-                    loc=merged.loc[over_mask, 'sharp_mean'].values,
-                    scale=merged.loc[over_mask, 'std_dev'].values
+                    merged.loc[over_mask, 'sharp_mean'].values,
+                    merged.loc[over_mask, 'std_dev'].values
                 )
             
             if under_mask.any():
-                merged.loc[under_mask, 'true_prob'] = stats.norm.cdf(
+                merged.loc[under_mask, 'true_prob'] = pricing_math.under_probability(
                     merged.loc[under_mask, 'line'].values,
-                    loc=merged.loc[under_mask, 'sharp_mean'].values,
-                    scale=merged.loc[under_mask, 'std_dev'].values
+                    merged.loc[under_mask, 'sharp_mean'].values,
+                    merged.loc[under_mask, 'std_dev'].values
                 )
             
-            print(f"INFO: Calculated probabilities using Normal distribution for {valid_count} bets")
+            logger.debug(f"Calculated probabilities using Normal distribution for {valid_count} lines")
         
         # For invalid std_dev: use mean comparison
         invalid_std = ~valid_std
@@ -206,19 +251,17 @@ class Game:
                 merged.loc[under_invalid, 'sharp_mean'] < merged.loc[under_invalid, 'line']
             ).astype(float)
             
-            print(f"WARNING: Using mean comparison fallback for {invalid_count} bets (no valid std_dev)")
-            invalid_players = merged[invalid_std][['player', 'market', 'bookmaker']].drop_duplicates()
-            print(f"         Players affected:")
-            for _, row in invalid_players.head(10).iterrows():
-                print(f"           - {row['player']} ({row['market']}) on {row['bookmaker']}")
-            if len(invalid_players) > 10:
-                print(f"           ... and {len(invalid_players) - 10} more")
+            if pricing_log.debug_enabled():
+                invalid = merged[invalid_std]
+                pricing_log.log_affected(f"Using mean comparison fallback for {invalid_count} lines (no valid std_dev):",
+                                         invalid['player'], invalid['market'])
         
         return merged
     
-    def _format_results(self, merged: pd.DataFrame, threshold: float) -> pd.DataFrame:
+    def _format_results(self, merged: pd.DataFrame, threshold: float, counters: dict) -> tuple[pd.DataFrame, str]:
         """
         Calculate EV, filter by threshold and sample size, and format output.
+        Returns the results and a note for the game summary when there are none.
         """
         # Calculate EV percentage (vectorized)
         merged['ev_percent'] = ((merged['true_prob'] * merged['price']) - 1) * 100
@@ -238,31 +281,19 @@ class Game:
         ].copy()
         
         final_count = len(result_df)
+        counters['low_sample'] += int(low_sample)
+        counters['ev_bets'] += final_count
         
-        # Log filtering summary
-        print(f"INFO: Filtering summary:")
-        print(f"  - Total bets evaluated: {total_bets}")
-        print(f"  - Bets meeting EV threshold (>={threshold}%): {above_threshold}")
-        print(f"  - Bets filtered due to low sample size (<=1): {low_sample}")
-        
-        # Show which players had low sample size
-        if low_sample > 0:
-            low_sample_players = merged[low_sample_mask][['player', 'market', 'sample_size']].drop_duplicates()
-            print(f"      Players with low sample size:")
-            for _, row in low_sample_players.head(10).iterrows():
-                print(f"        - {row['player']} ({row['market']}) n={row['sample_size']}")
-            if len(low_sample_players) > 10:
-                print(f"        ... and {len(low_sample_players) - 10} more")
-        
-        print(f"  - Final EV bets: {final_count}")
+        if pricing_log.debug_enabled():
+            logger.debug(f"Filtering summary: {total_bets} evaluated, {above_threshold} meeting EV threshold (>={threshold}%), "
+                         f"{low_sample} filtered due to low sample size (<=1), {final_count} final EV bets")
+            if low_sample > 0:
+                low = merged[low_sample_mask]
+                pricing_log.log_affected("Players with low sample size:", low['player'], low['market'], low['sample_size'])
         
         if final_count == 0:
             below_threshold = total_bets - above_threshold
-            if below_threshold > 0:
-                print(f"INFO: {below_threshold} bets were below EV threshold")
-            if low_sample > 0:
-                print(f"INFO: Consider lowering sample size requirement if too many bets are filtered")
-            return pd.DataFrame()
+            return pd.DataFrame(), f"{below_threshold} bets below EV threshold" if below_threshold > 0 else "no bets with enough samples"
         
         # Add game metadata
         result_df['sport_key'] = self.sport_key
@@ -282,49 +313,59 @@ class Game:
         # Sort by EV
         result_df = result_df.sort_values('ev_percent', ascending=False)
         
-        return result_df
+        return result_df, None
 
     def find_plus_ev(self, betting_books: list[str], sharp_books: list[str], threshold: float=0.0) -> pd.DataFrame:
         """
         Find positive expected value (EV) bets using vectorized operations.
+        Logs one summary record for the game; per-player details only at debug level.
         
         @param betting_books: Bookmakers user is betting on
         @param sharp_books: Bookmakers to use for sharp odds (their lines used as true mean)
         @param threshold: Minimum EV percentage to include in results (default 0.0)
         @return: DataFrame with plus EV bets sorted by EV percentage
         """
-        print(f"\n{'='*60}")
-        print(f"Finding EV bets for {self.home_team} vs {self.away_team}")
-        print(f"Betting books: {betting_books}")
-        print(f"Sharp books: {sharp_books}")
-        print(f"EV threshold: {threshold}%")
-        print(f"{'='*60}")
+        counters = pricing_log.new_counters()
+        result_df, note = self._find_plus_ev(betting_books, sharp_books, threshold, counters)
+        pricing_log.log_game_summary(self, counters, threshold, note)
+        return result_df
+    
+    def _find_plus_ev(self, betting_books: list[str], sharp_books: list[str], threshold: float,
+                      counters: dict) -> tuple[pd.DataFrame, str]:
+        """
+        find_plus_ev's pricing, counting issues into counters instead of logging each one.
+        Returns the EV bets and a note for the game summary when there are none.
+        """
+        logger.debug(f"Finding EV bets for {self.home_team} vs {self.away_team} "
+                     f"(betting books: {betting_books}, sharp books: {sharp_books}, EV threshold: {threshold}%)")
         
         # Filter dataframes
         sharp_df = self.odds_df[self.odds_df['bookmaker'].isin(sharp_books)].copy()
         betting_df = self.odds_df[self.odds_df['bookmaker'].isin(betting_books)].copy()
         
-        print(f"INFO: Found {len(betting_df)} betting lines and {len(sharp_df)} sharp lines")
+        # Pricing math runs in float64 on the quoted values
+        for df in (sharp_df, betting_df):
+            df['line'] = widen(df['line'].to_numpy())
+            df['price'] = widen(df['price'].to_numpy())
+        
+        counters['betting_lines'] = len(betting_df)
+        counters['sharp_lines'] = len(sharp_df)
         
         if betting_df.empty:
-            print("WARNING: No betting lines found for specified betting books")
-            return pd.DataFrame()
+            return pd.DataFrame(), "no betting lines found for specified betting books"
         
         if sharp_df.empty:
-            print("WARNING: No sharp lines found for specified sharp books")
-            return pd.DataFrame()
+            counters['unmatched'] = len(betting_df)
+            return pd.DataFrame(), "no sharp lines found for specified sharp books"
         
         # Get only 'Over' outcomes from sharp books for mean calculation
         sharp_over_df = sharp_df[sharp_df['outcome'] == 'Over'].copy()
         
-        print(f"INFO: Found {len(sharp_over_df)} sharp 'Over' lines for mean calculation")
-        
         if sharp_over_df.empty:
-            print("WARNING: No 'Over' outcomes found in sharp books")
-            return pd.DataFrame()
+            counters['unmatched'] = len(betting_df)
+            return pd.DataFrame(), "no 'Over' outcomes found in sharp books"
         
         # Pre-fetch all std_dev values at once (cached lookup)
-        print("\nFetching standard deviations...")
         std_cache = self._get_std_dev_batch(betting_df)
         
         # Add std_dev and sample_size to both dataframes
@@ -332,35 +373,46 @@ class Game:
         sharp_over_df = self._add_std_dev_to_dataframe(sharp_over_df, std_cache)
         
         # Calculate sharp means from sharp book lines
-        print("\nCalculating sharp means...")
-        sharp_agg = self._calculate_sharp_means(sharp_over_df)
+        sharp_agg = self._calculate_sharp_means(sharp_over_df, counters)
         
-        print(f"INFO: Calculated sharp means for {len(sharp_agg)} unique player/market combinations")
+        logger.debug(f"Calculated sharp means for {len(sharp_agg)} unique player/market combinations")
         
-        # Merge betting bets with aggregated sharp data
-        merged = betting_df.merge(sharp_agg, on=['player', 'market'], how='inner')
+        # DFS books mostly post the same player/market/line, so price each distinct
+        # line once and fan the result out to every book's row
+        line_ids, line_count = devig.group_ids(
+            betting_df['player'], betting_df['market'], betting_df['line'], betting_df['outcome']
+        )
+        first_rows = np.unique(line_ids, return_index=True)[1]
+        lines = betting_df.iloc[first_rows][['player', 'market', 'line', 'outcome', 'std_dev', 'sample_size']]
+        lines['_line_id'] = np.arange(line_count)
         
-        unmatched = len(betting_df) - len(merged)
-        if unmatched > 0:
-            print(f"WARNING: {unmatched} betting lines had no matching sharp data and were excluded")
+        # Merge distinct lines with aggregated sharp data
+        lines = lines.merge(sharp_agg, on=['player', 'market'], how='inner')
+        line_position = np.full(line_count, -1)
+        line_position[lines['_line_id'].to_numpy()] = np.arange(len(lines))
+        row_position = line_position[line_ids]
+        matched = row_position >= 0
         
-        if merged.empty:
-            print("WARNING: No betting lines matched with sharp data")
-            return pd.DataFrame()
+        counters['unmatched'] = int((~matched).sum())
+        counters['matched'] = int(matched.sum())
         
-        print(f"INFO: {len(merged)} betting lines matched with sharp data")
+        if not matched.any():
+            return pd.DataFrame(), "no betting lines matched with sharp data"
         
-        # Calculate true probabilities
-        print("\nCalculating true probabilities...")
-        merged = self._calculate_true_probabilities(merged)
+        logger.debug(f"{counters['matched']} betting lines matched with sharp data ({len(lines)} distinct lines)")
         
-        # Format results and filter by threshold
-        print("\nFiltering and formatting results...")
-        result_df = self._format_results(merged, threshold)
+        # Calculate true probabilities
+        lines = self._calculate_true_probabilities(lines)
         
-        print(f"{'='*60}\n")
+        merged = betting_df[matched].reset_index(drop=True)
+        row_position = row_position[matched]
+        for column in ('sharp_mean', 'implied_means', 'true_prob'):
+            merged[column] = lines[column].to_numpy()[row_position]
+        std_dev = merged['std_dev'].to_numpy()
+        counters['fallback_std'] = int((~(std_dev > 0) | np.isnan(std_dev)).sum())
         
-        return result_df
+        # Format results and filter by threshold
+        return self._format_results(merged, threshold, counters)
     
 
         
@@ -0,0 +1,155 @@
+import os
+import time
+import threading
+
+# How long a key that ran out of credits is rested before it is tried again
+API_KEY_EXHAUSTED_RETRY_MINUTES = float(os.getenv('API_KEY_EXHAUSTED_RETRY_MINUTES', '60'))
+
+
+def parse_api_keys(value: str) -> list[str]:
+    """Split a comma-separated list of API keys, dropping blanks and duplicates."""
+    keys = []
+    for key in (value or '').split(','):
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def mask_key(key: str) -> str:
+    """Short, log-safe form of an API key."""
+    return f'...{key[-4:]}' if len(key) > 4 else key
+
+
+class ApiKeyPool:
+    """
+    Pool of Odds API keys, each with its own monthly quota.
+
+    Every request is routed to the key with the most remaining quota, as reported by the
+    x-requests-remaining header of that key's last response (keys not used yet go first,
+    and requests already in flight on a key count against it). A key that answers
+    OUT_OF_USAGE_CREDITS is taken out of rotation for exhausted_retry_minutes, so
+    requests fail over to the other keys.
+    """
+
+    def __init__(self, keys: list[str], exhausted_retry_minutes: float = API_KEY_EXHAUSTED_RETRY_MINUTES):
+        if not keys:
+            raise ValueError('ApiKeyPool needs at least one API key')
+        self.exhausted_retry_seconds = exhausted_retry_minutes * 60
+        self._lock = threading.Lock()
+        self._keys = {
+            key: {
+                'remaining': None,
+                'used': None,
+                'last_cost': None,
+                'requests': 0,
+                'in_flight': 0,
+                'exhausted_at': None,
+                'first_used': None,
+                'first_used_value': None,
+            }
+            for key in keys
+        }
+
+    def _available(self, state: dict, now: float) -> bool:
+        return state['exhausted_at'] is None or now - state['exhausted_at'] >= self.exhausted_retry_seconds
+
+    def _headroom(self, state: dict) -> float:
+        if state['remaining'] is None:
+            return float('inf')
+        return state['remaining'] - state['in_flight'] * (state['last_cost'] or 1)
+
+    def acquire(self) -> str:
+        """
+        Pick the key for the next request; pair every call with release().
+
+        Returns:
+            str: Key with the most remaining quota (if every key is exhausted, the one
+                 with the most headroom, so the request still fails the normal way)
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [key for key, state in self._keys.items() if self._available(state, now)] or list(self._keys)
+            # Ties (e.g. keys not used yet) go to the key with the fewest requests in flight
+            key = max(candidates, key=lambda k: (self._headroom(self._keys[k]), -self._keys[k]['in_flight']))
+            self._keys[key]['in_flight'] += 1
+            self._keys[key]['requests'] += 1
+            return key
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._keys[key]['in_flight'] -= 1
+
+    def record(self, key: str, status_code: int, headers, body: str = '') -> bool:
+        """
+        Record a response sent with a key.
+
+        Returns:
+            bool: True if the key has run out of credits (the request should fail over)
+        """
+        exhausted = status_code == 401 and 'OUT_OF_USAGE_CREDITS' in body
+        with self._lock:
+            state = self._keys[key]
+            if headers.get('x-requests-remaining') is not None:
+                state['remaining'] = float(headers['x-requests-remaining'])
+            if headers.get('x-requests-used') is not None:
+                state['used'] = float(headers['x-requests-used'])
+                if state['first_used'] is None:
+                    state['first_used'] = time.monotonic()
+                    state['first_used_value'] = state['used']
+            if headers.get('x-requests-last') is not None:
+                state['last_cost'] = float(headers['x-requests-last'])
+
+            if exhausted:
+                state['exhausted_at'] = time.monotonic()
+                state['remaining'] = 0.0
+            elif status_code == 200:
+                state['exhausted_at'] = None
+        return exhausted
+
+    def has_available(self, exclude: str = None) -> bool:
+        """Whether a key other than `exclude` is currently in rotation."""
+        now = time.monotonic()
+        with self._lock:
+            return any(key != exclude and self._available(state, now) for key, state in self._keys.items())
+
+    def quota_headers(self) -> dict:
+        """Quota headers summed over the pool's keys, in the form QuotaBudget.record expects."""
+        with self._lock:
+            known = [state for state in self._keys.values() if state['remaining'] is not None]
+            if not known:
+                return {}
+            headers = {'x-requests-remaining': str(sum(state['remaining'] for state in known))}
+            used = [state['used'] for state in known if state['used'] is not None]
+            if used:
+                headers['x-requests-used'] = str(sum(used))
+            return headers
+
+    def usage(self) -> list[dict]:
+        """
+        Per-key usage, for watching each key's burn rate.
+
+        Returns:
+            list: Dicts with key (masked), remaining, used, last_cost, requests, exhausted
+                  and used_per_hour (quota spent per hour since this process first used the key)
+        """
+        now = time.monotonic()
+        with self._lock:
+            usage = []
+            for key, state in self._keys.items():
+                used_per_hour = None
+                if state['first_used'] is not None and now > state['first_used']:
+                    used_per_hour = (state['used'] - state['first_used_value']) / ((now - state['first_used']) / 3600)
+                usage.append({
+                    'key': mask_key(key),
+                    'remaining': state['remaining'],
+                    'used': state['used'],
+                    'last_cost': state['last_cost'],
+                    'requests': state['requests'],
+                    'exhausted': not self._available(state, now),
+                    'used_per_hour': used_per_hour
+                })
+            return usage
+
+    def __len__(self):
+        return len(self._keys)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Backfill historical player prop odds into a local odds archive
+Usage: python backfill_odds.py ARCHIVE_DIR --start 2024-09-01 --end 2025-02-15 [--sport nfl|nba|both]
+       [--offsets-minutes 60] [--step-hours 24] [--concurrency 8]
+
+Walks the date range taking a historical events snapshot every --step-hours, then pulls
+the historical odds of each event at each offset before its kickoff. Snapshots are
+written with odds_archive.ArchiveWriter (kind 'odds', fetch_time = the snapshot time),
+so the archive can be fed straight to `scheduler.py --replay`.
+
+Progress is checkpointed to ARCHIVE_DIR/backfill-checkpoint.jsonl after the archive has
+been flushed; rerunning the same command after an interruption skips completed work.
+"""
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from get_data import OddsApiClient, FETCH_CONCURRENCY
+from odds_archive import ArchiveWriter, utc_timestamp
+from quota_budget import QuotaBudget
+from scheduler import SPORT_CONFIGS, ODDS_REGIONS, ODDS_BOOKMAKERS
+
+# Load environment variables
+load_dotenv()
+
+CHECKPOINT_FILE = 'backfill-checkpoint.jsonl'
+# Flush the archive and write the checkpoint every N completed requests
+CHECKPOINT_EVERY = 50
+
+
+def parse_time(value: str) -> datetime:
+    when = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return when if when.tzinfo is not None else when.replace(tzinfo=timezone.utc)
+
+
+def api_timestamp(when: datetime) -> str:
+    return when.astimezone(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+
+class BackfillCheckpoint:
+    """
+    Append-only record of completed backfill requests.
+
+    Each line is a JSON object: events snapshots record the events they listed, so a
+    resumed run can rebuild its odds task list without repeating those calls.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.events = {}
+        self.odds = set()
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partially written last line from an interrupted run
+                        continue
+                    if entry['type'] == 'events':
+                        self.events[(entry['sport'], entry['date'])] = entry['events']
+                    else:
+                        self.odds.add((entry['sport'], entry['event_id'], entry['date']))
+
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, entries: list[dict]) -> None:
+        with self._lock:
+            for entry in entries:
+                self._file.write(json.dumps(entry) + '\n')
+                if entry['type'] == 'events':
+                    self.events[(entry['sport'], entry['date'])] = entry['events']
+                else:
+                    self.odds.add((entry['sport'], entry['event_id'], entry['date']))
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def snapshot_times(start: datetime, end: datetime, step_hours: float) -> list[datetime]:
+    times = []
+    when = start
+    while when < end:
+        times.append(when)
+        when += timedelta(hours=step_hours)
+    return times
+
+
+def run_concurrently(tasks: list, fetch, on_result, concurrency: int, label: str) -> None:
+    """Run fetch(task) for every task on a bounded thread pool, passing results to on_result in the caller's thread."""
+    if not tasks:
+        return
+    start = time.perf_counter()
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(tasks)))) as executor:
+        futures = {executor.submit(fetch, task): task for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error backfilling {label} {task}: {e}")
+                result = None
+            on_result(task, result)
+            done += 1
+            if done % 100 == 0 or done == len(tasks):
+                elapsed = time.perf_counter() - start
+                print(f"  {label}: {done}/{len(tasks)} ({done / elapsed:.1f}/s)")
+
+
+def backfill(archive_dir: str, sports: list[str], start: datetime, end: datetime,
+             offsets_minutes: list[float], step_hours: float = 24, concurrency: int = FETCH_CONCURRENCY,
+             client: OddsApiClient = None) -> dict:
+    """
+    Backfill historical event odds for the given sports into an odds archive
+
+    Args:
+        archive_dir (str): Archive directory (created if needed)
+        sports (list): Sports to backfill, e.g. ['nfl', 'nba']
+        start (datetime): Start of the range (UTC)
+        end (datetime): End of the range (UTC)
+        offsets_minutes (list): Take an odds snapshot this many minutes before each kickoff
+        step_hours (float): Spacing of historical events snapshots
+        concurrency (int): Maximum number of requests in flight
+        client (OddsApiClient): Client to use; a new one with a QuotaBudget if None
+
+    Returns:
+        dict: Counts of events snapshots, odds snapshots written and failed requests
+    """
+    client = client or OddsApiClient(pool_size=concurrency, budget=QuotaBudget())
+    archive = ArchiveWriter(archive_dir)
+    checkpoint = BackfillCheckpoint(os.path.join(archive_dir, CHECKPOINT_FILE))
+    summary = {'events_snapshots': 0, 'odds_snapshots': 0, 'failed': 0, 'skipped': 0}
+    pending = []
+
+    def commit_pending(force: bool = False):
+        # Only checkpoint work whose archive records are on disk
+        if pending and (force or len(pending) >= CHECKPOINT_EVERY):
+            archive.flush()
+            checkpoint.write(pending)
+            pending.clear()
+
+    try:
+        for sport in sports:
+            config = SPORT_CONFIGS[sport]
+            sport_key = config['sport_key']
+            print(f"\nBackfilling {config['sport_title']} from {start:%Y-%m-%d} to {end:%Y-%m-%d}")
+
+            # Events snapshots across the range
+            times = [api_timestamp(when) for when in snapshot_times(start, end, step_hours)]
+            todo = [date for date in times if (sport_key, date) not in checkpoint.events]
+            summary['skipped'] += len(times) - len(todo)
+
+            def fetch_events(date):
+                return client.get_historical_events(sport_key, date)
+
+            def on_events(date, response):
+                if response is None:
+                    summary['failed'] += 1
+                    return
+                archive.record('events', sport_key, None, json.dumps(response['data']).encode(),
+                               utc_timestamp(parse_time(response['timestamp'])))
+                pending.append({
+                    'type': 'events', 'sport': sport_key, 'date': date,
+                    'events': [{'id': e['id'], 'commence_time': e['commence_time']} for e in response['data']]
+                })
+                summary['events_snapshots'] += 1
+                commit_pending()
+
+            run_concurrently(todo, fetch_events, on_events, concurrency, f"{config['sport_title']} events")
+            commit_pending(force=True)
+
+            # Every event commencing inside the range, each snapshotted at each offset
+            events = {}
+            for date in times:
+                for event in checkpoint.events.get((sport_key, date), []):
+                    if start <= parse_time(event['commence_time']) < end:
+                        events[event['id']] = event
+            now = datetime.now(timezone.utc)
+            tasks = []
+            for event in events.values():
+                for offset in offsets_minutes:
+                    when = parse_time(event['commence_time']) - timedelta(minutes=offset)
+                    if when < now:
+                        tasks.append((event['id'], api_timestamp(when)))
+            todo = [task for task in tasks if (sport_key, *task) not in checkpoint.odds]
+            summary['skipped'] += len(tasks) - len(todo)
+            print(f"{len(events)} {config['sport_title']} events, {len(todo)} of {len(tasks)} odds snapshots to fetch")
+
+            def fetch_odds(task):
+                event_id, date = task
+                return client.get_historical_event_odds(sport_key, event_id, date, ODDS_REGIONS,
+                                                        config['markets'], 'decimal', ODDS_BOOKMAKERS)
+
+            def on_odds(task, response):
+                event_id, date = task
+                if response is None:
+                    summary['failed'] += 1
+                    return
+                archive.record('odds', sport_key, event_id, json.dumps(response['data']).encode(),
+                               utc_timestamp(parse_time(response['timestamp'])))
+                pending.append({'type': 'odds', 'sport': sport_key, 'event_id': event_id, 'date': date})
+                summary['odds_snapshots'] += 1
+                commit_pending()
+
+            run_concurrently(todo, fetch_odds, on_odds, concurrency, f"{config['sport_title']} odds")
+            commit_pending(force=True)
+    finally:
+        commit_pending(force=True)
+        archive.close()
+        checkpoint.close()
+
+    timing = client.timing_summary()
+    print(f"\nBackfill complete: {summary['events_snapshots']} events snapshots, {summary['odds_snapshots']} odds snapshots, "
+          f"{summary['failed']} failed, {summary['skipped']} already done")
+    print(f"Odds API requests: {timing['request_count']} total, avg {timing['avg_seconds']:.3f}s, "
+          f"{timing['retry_count']} retries")
+    if client.budget is not None and client.budget.remaining is not None:
+        print(f"Odds API quota: {client.budget.remaining:.0f} remaining")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Backfill historical player prop odds into a local odds archive'
+    )
+    parser.add_argument('archive_dir', type=str, help='Archive directory to write to')
+    parser.add_argument('--start', type=str, required=True, help='Start date (YYYY-MM-DD or ISO timestamp, UTC)')
+    parser.add_argument('--end', type=str, required=True, help='End date, exclusive (YYYY-MM-DD or ISO timestamp, UTC)')
+    parser.add_argument(
+        '--sport',
+        type=str,
+        choices=['nfl', 'nba', 'both'],
+        default='both',
+        help='Which sport to backfill: nfl, nba, or both (default: both)'
+    )
+    parser.add_argument(
+        '--offsets-minutes',
+        type=float,
+        nargs='+',
+        default=[60],
+        help='Snapshot each event this many minutes before kickoff (default: 60)'
+    )
+    parser.add_argument('--step-hours', type=float, default=24, help='Hours between events snapshots (default: 24)')
+    parser.add_argument('--concurrency', type=int, default=FETCH_CONCURRENCY,
+                        help=f'Maximum requests in flight (default: {FETCH_CONCURRENCY})')
+    args = parser.parse_args()
+
+    if not os.getenv('API_KEY') and not os.getenv('API_KEYS'):
+        print("ERROR: API_KEY (or API_KEYS) environment variable is not set!")
+        exit(1)
+
+    start = parse_time(args.start if 'T' in args.start else f'{args.start}T00:00:00Z')
+    end = parse_time(args.end if 'T' in args.end else f'{args.end}T00:00:00Z')
+    sports = list(SPORT_CONFIGS) if args.sport == 'both' else [args.sport]
+
+    backfill(args.archive_dir, sports, start, end, args.offsets_minutes, args.step_hours, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
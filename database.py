@@ -71,7 +71,29 @@ class Database:
             if rows_affected > 0:
                 print(f"Deactivated {rows_affected} previously active {sport_title} bets")
     
-    def insert_ev_bets(self, ev_bets_df, game_id):
+    def deactivate_bets_for_game(self, game_id):
+        """
+        Deactivate all currently active bets for a single game.
+        Used when one game is repriced on its own refresh schedule.
+        
+        Args:
+            game_id (str): The game ID whose bets should be deactivated
+        
+        Returns:
+            int: Number of bets deactivated
+        """
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                UPDATE ev_bets 
+                SET is_active = FALSE 
+                WHERE is_active = TRUE
+                AND game_id = %s
+            """, (game_id,))
+            rows_affected = cur.rowcount
+            self.conn.commit()
+            return rows_affected
+    
+    def insert_ev_bets(self, ev_bets_df, game_id, skip_commenced=True):
         """
         Insert EV bets from a DataFrame as active bets.
         All bets are inserted as active (is_active = TRUE).
@@ -80,6 +102,8 @@ class Database:
         Args:
             ev_bets_df (pd.DataFrame): DataFrame containing EV bets
             game_id (str): The game ID to associate bets with
+            skip_commenced (bool): Skip games that have already commenced (disabled when
+                replaying archived odds)
         """
         if len(ev_bets_df) == 0:
             print(f"No EV bets to insert for game {game_id}")
@@ -99,7 +123,7 @@ class Database:
                 return
             
             # Check if game has already commenced
-            if game_info['commence_time'] <= datetime.now(game_info['commence_time'].tzinfo):
+            if skip_commenced and game_info['commence_time'] <= datetime.now(game_info['commence_time'].tzinfo):
                 print(f"Warning: Game {game_id} has already commenced. Skipping bet insertion to prevent invalid bets.")
                 return
         
@@ -159,6 +183,48 @@ class Database:
             self.conn.commit()
             print(f"Inserted {inserted_count} EV bets for game {game_id}")
     
+    def apply_ev_bet_changes(self, game_id, changes, skip_commenced=True):
+        """
+        Apply a change set from IncrementalPricer to a game's active bets, instead of
+        deactivating and re-inserting all of them.
+
+        Removed bets are deactivated and added and updated bets are upserted; the game's
+        other active bets are left as they are.
+
+        Args:
+            game_id (str): The game ID the changes belong to
+            changes (dict): 'added', 'updated' and 'removed' DataFrames (see incremental_ev.diff_bets)
+            skip_commenced (bool): Skip games that have already commenced
+
+        Returns:
+            int: Number of bets deactivated
+        """
+        removed = changes['removed']
+        deactivated = 0
+        if len(removed) > 0:
+            # One statement for the whole change set: the removed keys go in as parallel
+            # arrays and are joined back to the game's active rows
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE ev_bets
+                    SET is_active = FALSE
+                    FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[], %s::numeric[])
+                        AS removed (bookmaker, market, player, outcome, betting_line)
+                    WHERE ev_bets.game_id = %s AND ev_bets.is_active = TRUE
+                    AND ev_bets.bookmaker = removed.bookmaker AND ev_bets.market = removed.market
+                    AND ev_bets.player = removed.player AND ev_bets.outcome = removed.outcome
+                    AND ev_bets.betting_line = removed.betting_line
+                """, (removed['bookmaker'].astype(str).tolist(), removed['market'].astype(str).tolist(),
+                      removed['player'].astype(str).tolist(), removed['outcome'].astype(str).tolist(),
+                      removed['betting_line'].astype(float).tolist(), game_id))
+                deactivated = cur.rowcount
+            self.conn.commit()
+
+        upserts = [df for df in (changes['added'], changes['updated']) if len(df) > 0]
+        if upserts:
+            self.insert_ev_bets(pd.concat(upserts), game_id, skip_commenced)
+        return deactivated
+
     def deactivate_old_bets(self, hours=24):
         """
         Mark bets older than X hours as inactive
@@ -0,0 +1,294 @@
+import os
+import numpy as np
+import pandas as pd
+
+DEVIG_METHODS = ('multiplicative', 'additive', 'power', 'shin')
+DEVIG_METHOD = os.getenv('DEVIG_METHOD', 'multiplicative')
+
+_SOLVER_ITERATIONS = 60
+# Newton converges quadratically, so once its step is below this the exponent is already
+# accurate to ~1e-14
+_NEWTON_TOLERANCE = 1e-7
+
+
+def set_default_method(method: str) -> None:
+    """Set the devig method used when none is passed explicitly (e.g. from a --devig flag)."""
+    global DEVIG_METHOD
+    if method not in DEVIG_METHODS:
+        raise ValueError(f"Unknown devig method '{method}', expected one of {', '.join(DEVIG_METHODS)}")
+    DEVIG_METHOD = method
+
+
+def _codes(column) -> np.ndarray:
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Always a copy: group_ids packs the key in place
+        return np.array(column.array.codes, dtype=np.int64)
+    values = np.asarray(column)
+    if values.dtype.kind == 'f' and len(values):
+        # Prop lines sit on a quarter-point grid, which maps straight to integers
+        scaled = values * 4
+        rounded = np.rint(scaled)
+        if np.array_equal(scaled, rounded):
+            return rounded.astype(np.int64) - int(rounded.min())
+    return pd.factorize(values, use_na_sentinel=False)[0].astype(np.int64)
+
+
+def group_ids(*columns) -> tuple[np.ndarray, int]:
+    """
+    Factorize the key columns (e.g. bookmaker, market, player, line) into dense group ids.
+
+    Categorical columns contribute their codes directly; anything else is factorized
+    first. The per-column codes are packed into one int64 key, and ids are numbered in
+    order of first appearance.
+
+    Returns:
+        tuple: (ids, group_count) with ids[i] in [0, group_count)
+    """
+    key = _codes(columns[0])
+    for column in columns[1:]:
+        codes = _codes(column)
+        key *= int(codes.max()) + 1 if len(codes) else 1
+        key += codes
+    if len(key) < 2:
+        ids, uniques = pd.factorize(key)
+        return ids, len(uniques)
+    # A book lists a player's Over and Under next to each other, so groups are usually
+    # runs of equal keys. If no key starts two runs (a sort is cheaper than hashing),
+    # the runs are the groups; otherwise only the first key of each run is hashed.
+    run_starts = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+    run_lengths = np.diff(run_starts, append=len(key))
+    run_keys = np.sort(key[run_starts])
+    if (run_keys[1:] != run_keys[:-1]).all():
+        return np.repeat(np.arange(len(run_starts)), run_lengths), len(run_starts)
+    run_ids, uniques = pd.factorize(key[run_starts])
+    return np.repeat(run_ids, run_lengths), len(uniques)
+
+
+def _group_sum(values: np.ndarray, ids: np.ndarray, group_count: int) -> np.ndarray:
+    return np.bincount(ids, weights=values, minlength=group_count)
+
+
+def _multiplicative(implied: np.ndarray, ids: np.ndarray, group_count: int) -> np.ndarray:
+    return implied / _group_sum(implied, ids, group_count)[ids]
+
+
+def _additive(implied: np.ndarray, ids: np.ndarray, group_count: int) -> np.ndarray:
+    # Spread the overround equally; long shots can go non-positive, so keep them a sliver above 0
+    overround = _group_sum(implied, ids, group_count) - 1
+    sizes = np.bincount(ids, minlength=group_count)
+    return np.clip(implied - (overround / sizes)[ids], 1e-9, 1.0)
+
+
+def _power(implied: np.ndarray, ids: np.ndarray, group_count: int) -> np.ndarray:
+    # Solve sum(q_i ** k) = 1 for each group's k with vectorized Newton steps
+    log_implied = np.log(implied)
+    k = np.ones(group_count)
+    for _ in range(_SOLVER_ITERATIONS):
+        powered = implied ** k[ids]
+        f = _group_sum(powered, ids, group_count) - 1
+        slope = _group_sum(powered * log_implied, ids, group_count)
+        step = np.divide(f, slope, out=np.zeros(group_count), where=slope != 0)
+        k -= step
+        if np.abs(step).max(initial=0.0) < _NEWTON_TOLERANCE:
+            break
+    return implied ** k[ids]
+
+
+def _shin(implied: np.ndarray, ids: np.ndarray, group_count: int) -> np.ndarray:
+    # Shin's insider share z in [0, 1) makes the probabilities sum to 1; bisect every group at once
+    totals = _group_sum(implied, ids, group_count)
+    scaled = implied ** 2 / totals[ids]
+
+    def probabilities(z):
+        zi = z[ids]
+        return (np.sqrt(zi ** 2 + 4 * (1 - zi) * scaled) - zi) / (2 * (1 - zi))
+
+    low = np.zeros(group_count)
+    high = np.full(group_count, 0.999)
+    for _ in range(_SOLVER_ITERATIONS):
+        mid = (low + high) / 2
+        too_high = _group_sum(probabilities(mid), ids, group_count) > 1
+        low = np.where(too_high, mid, low)
+        high = np.where(too_high, high, mid)
+    return probabilities((low + high) / 2)
+
+
+def _pair_rows(ids: np.ndarray, sizes: np.ndarray) -> tuple:
+    """Rows (index arrays, or slices) of the first and second outcome of every two-outcome group."""
+    steps = np.diff(ids)
+    if ids[0] == 0 and steps.min(initial=0) >= 0 and steps.max(initial=0) <= 1:
+        # Every group is one run and runs are in id order (as group_ids numbers them when
+        # each group's rows are adjacent), so a group's rows start at its offset
+        if len(ids) == 2 * len(sizes) and (sizes == 2).all():
+            return slice(0, None, 2), slice(1, None, 2)
+        starts = np.concatenate(([0], np.cumsum(sizes[:-1])))
+        first = starts[sizes == 2]
+        return first, first + 1
+    rows = np.arange(len(ids))
+    first = np.empty(len(sizes), dtype=np.intp)
+    last = np.empty(len(sizes), dtype=np.intp)
+    # Fancy assignment keeps the last write, so the reversed pass leaves each group's first row
+    first[ids[::-1]] = rows[::-1]
+    last[ids] = rows
+    pairs = np.flatnonzero(sizes == 2)
+    return first[pairs], last[pairs]
+
+
+# Two-outcome (Over/Under) groups are nearly every group, and solve elementwise without
+# any per-group sums: (p_first, p_second) from the two implied probabilities
+
+def _additive_pair(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    half_overround = (a + b - 1) / 2
+    return np.clip(a - half_overround, 1e-9, 1.0), np.clip(b - half_overround, 1e-9, 1.0)
+
+
+def _power_pair(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    log_a = np.log(a)
+    log_b = np.log(b)
+    # The first Newton step from k = 1 needs no powers; Halley steps (cubic convergence)
+    # take it from there, so two are usually enough
+    slope = a * log_a + b * log_b
+    k = 1 - np.divide(a + b - 1, slope, out=np.zeros(len(a)), where=slope != 0)
+    for _ in range(_SOLVER_ITERATIONS):
+        a_k = np.exp(k * log_a)
+        b_k = np.exp(k * log_b)
+        f = a_k + b_k - 1
+        slope = a_k * log_a + b_k * log_b
+        denominator = 2 * slope * slope - f * (a_k * log_a * log_a + b_k * log_b * log_b)
+        step = np.divide(2 * f * slope, denominator, out=np.zeros(len(a)), where=denominator != 0)
+        k -= step
+        # Cubic convergence: a step below 1e-5 leaves k accurate to ~1e-15
+        if np.abs(step).max(initial=0.0) < 1e-5:
+            break
+    return np.exp(k * log_a), np.exp(k * log_b)
+
+
+def _shin_pair(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Closed form for two outcomes (Jullien & Salanie): z = (S - 1)(d^2 - S) / (S(d^2 - 1)),
+    # clipped to the same [0, 0.999] range the bisection searches
+    total = a + b
+    diff_squared = (a - b) ** 2
+    denominator = total * (diff_squared - 1)
+    z = np.divide((total - 1) * (diff_squared - total), denominator, out=np.zeros(len(a)), where=denominator != 0)
+    np.minimum(np.maximum(z, 0.0, out=z), 0.999, out=z)
+
+    # p = (sqrt(z^2 + 4(1 - z) pi^2 / S) - z) / (2(1 - z))
+    z_squared = z * z
+    scale = 4 * (1 - z) / total
+    half = 0.5 / (1 - z)
+    return (np.sqrt(z_squared + scale * a * a) - z) * half, (np.sqrt(z_squared + scale * b * b) - z) * half
+
+
+_KERNELS = {
+    'multiplicative': _multiplicative,
+    'additive': _additive,
+    'power': _power,
+    'shin': _shin,
+}
+
+_PAIR_KERNELS = {
+    'additive': _additive_pair,
+    'power': _power_pair,
+    'shin': _shin_pair,
+}
+
+
+def devig(prices, ids: np.ndarray, group_count: int, method: str = None) -> np.ndarray:
+    """
+    Remove the bookmaker margin from decimal prices, one market (group) at a time.
+
+    Args:
+        prices: Decimal prices
+        ids: Group id of each price from group_ids(), e.g. one group per bookmaker/market/player/line
+        group_count: Number of groups
+        method: 'multiplicative', 'additive', 'power' or 'shin' (defaults to DEVIG_METHOD)
+
+    Returns:
+        np.ndarray: Devigged probability of each price. Outcomes with no counterpart in
+                    their group get probability 1, as with multiplicative devigging.
+    """
+    method = method or DEVIG_METHOD
+    if method not in _KERNELS:
+        raise ValueError(f"Unknown devig method '{method}', expected one of {', '.join(DEVIG_METHODS)}")
+
+    implied = 1 / np.asarray(prices, dtype=np.float64)
+    if method == 'multiplicative' or len(implied) == 0:
+        return _multiplicative(implied, ids, group_count)
+
+    # Single-outcome groups keep probability 1; two-outcome groups use the elementwise
+    # solvers and only larger groups go through the grouped ones
+    sizes = np.bincount(ids, minlength=group_count)
+    probs = np.ones(len(implied))
+    first, second = _pair_rows(ids, sizes)
+    if isinstance(first, slice) or len(first):
+        probs[first], probs[second] = _PAIR_KERNELS[method](implied[first], implied[second])
+    if sizes.max() > 2:
+        larger = sizes[ids] > 2
+        groups, larger_ids = np.unique(ids[larger], return_inverse=True)
+        probs[larger] = _KERNELS[method](implied[larger], larger_ids, len(groups))
+    return probs
+
+
+def groupby_devig(odds_df: pd.DataFrame) -> np.ndarray:
+    """The previous pandas groupby implementation (multiplicative only), kept for benchmarking."""
+    implied = 1 / odds_df['price']
+    total = implied.groupby([odds_df['bookmaker'], odds_df['market'], odds_df['player'], odds_df['line']], observed=True).transform('sum')
+    return (implied / total).to_numpy()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from pandas.api.types import union_categoricals
+    from fake_odds_api import FakeSlate, FakeOddsConfig
+    from get_data import NFL, NBA
+    from Game import Game
+    from odds_layout import widen
+
+    parser = argparse.ArgumentParser(description='Benchmark the devig kernel against the pandas groupby')
+    parser.add_argument('--sport', choices=['nfl', 'nba'], default='nfl', help='Sport of the synthetic slate (default: nfl)')
+    parser.add_argument('--games', type=int, default=16, help='Games in the slate (default: 16)')
+    parser.add_argument('--repeat', type=int, default=20, help='Timing repetitions (default: 20)')
+    args = parser.parse_args()
+
+    slate = FakeSlate(FakeOddsConfig(sport={'nfl': NFL, 'nba': NBA}[args.sport], games=args.games))
+    frames = [
+        Game(event['id'], event['sport_key'], event['sport_title'], event['commence_time'], event['home_team'],
+             event['away_team'], slate.odds[event['id']]['bookmakers'], None, None).odds_df
+        for event in slate.events
+    ]
+    for frame in frames:
+        frame['price'] = widen(frame['price'].to_numpy())
+    odds_df = pd.concat(frames, ignore_index=True)
+    for column in ('bookmaker', 'market', 'player', 'outcome'):
+        odds_df[column] = union_categoricals([frame[column] for frame in frames])
+    prices = [frame['price'].to_numpy() for frame in frames]
+    print(f"{args.games}-game {args.sport.upper()} slate: {len(odds_df)} outcomes")
+
+    def key_columns(odds_df: pd.DataFrame) -> list:
+        return [odds_df['bookmaker'], odds_df['market'], odds_df['player'], odds_df['line']]
+
+    def best(fn):
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    # Each row is compared with the groupby over the same data: per game with per game,
+    # whole slate with whole slate
+    per_game_baseline = best(lambda: [groupby_devig(frame) for frame in frames])
+    whole_baseline = best(lambda: groupby_devig(odds_df))
+    print(f"  {'groupby, per game':<32} {per_game_baseline * 1000:8.2f} ms")
+    print(f"  {'groupby, whole slate':<32} {whole_baseline * 1000:8.2f} ms")
+    for method in DEVIG_METHODS:
+        per_game = best(lambda: [
+            devig(price, *group_ids(*key_columns(frame)), method=method) for frame, price in zip(frames, prices)
+        ])
+        whole = best(lambda: devig(odds_df['price'].to_numpy(), *group_ids(*key_columns(odds_df)), method=method))
+        print(f"  {method + ', per game':<32} {per_game * 1000:8.2f} ms  ({per_game_baseline / per_game:.1f}x)")
+        print(f"  {method + ', whole slate':<32} {whole * 1000:8.2f} ms  ({whole_baseline / whole:.1f}x)")
+
+    ids, count = group_ids(*key_columns(odds_df))
+    assert np.array_equal(devig(odds_df['price'].to_numpy(), ids, count, 'multiplicative'), groupby_devig(odds_df))
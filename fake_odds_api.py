@@ -0,0 +1,399 @@
+"""
+Local stand-in for The Odds API, for load-testing the scheduler without spending quota.
+
+Serves the two endpoints the scheduler uses:
+    GET /v4/sports/{sport}/events
+    GET /v4/sports/{sport}/events/{event_id}/odds
+
+Responses are built from a synthetic slate with the same shape as the real API, including
+the x-requests-remaining / x-requests-used / x-requests-last headers. Latency and 429
+responses can be injected.
+
+Run the server:
+    python fake_odds_api.py --sport nba --games 12 --latency-ms 150 --rate-limit-rate 0.02
+
+Then point the scheduler at it:
+    ODDS_API_BASE_URL=http://localhost:8001/v4 API_KEY=test python scheduler.py --once
+"""
+
+import argparse
+import asyncio
+import hashlib
+import math
+import random
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+from get_data import NFL, NBA, NFL_MARKETS, NBA_MARKETS
+import pricing_math
+
+DFS_BOOKS = ['prizepicks', 'underdog', 'betr_us_dfs', 'pick6']
+SHARP_BOOKS = ['fanduel', 'draftkings']
+
+BOOKMAKER_TITLES = {
+    'prizepicks': 'PrizePicks',
+    'underdog': 'Underdog',
+    'betr_us_dfs': 'Betr Picks',
+    'pick6': 'DraftKings Pick6',
+    'fanduel': 'FanDuel',
+    'draftkings': 'DraftKings',
+    'betmgm': 'BetMGM',
+    'espnbet': 'ESPN BET',
+    'hardrockbet': 'Hard Rock Bet',
+}
+
+SPORT_TITLES = {NFL: 'NFL', NBA: 'NBA'}
+SPORT_MARKETS = {NFL: NFL_MARKETS, NBA: NBA_MARKETS}
+
+# Typical (low, high) line range per market, used to draw player means
+MARKET_LINE_RANGES = {
+    'player_points': (5, 32),
+    'player_rebounds': (2, 13),
+    'player_assists': (1, 10),
+    'player_threes': (0.5, 4.5),
+    'player_blocks': (0.5, 2.5),
+    'player_steals': (0.5, 2.5),
+    'player_turnovers': (0.5, 4.5),
+    'player_field_goals': (0.5, 2.5),
+    'player_pass_attempts': (25, 40),
+    'player_pass_completions': (15, 27),
+    'player_pass_interceptions': (0.5, 1.5),
+    'player_pass_tds': (0.5, 2.5),
+    'player_pass_yds': (160, 300),
+    'player_pats': (1.5, 3.5),
+    'player_receptions': (1.5, 7.5),
+    'player_reception_tds': (0.5, 0.5),
+    'player_reception_yds': (15, 95),
+    'player_rush_attempts': (5, 20),
+    'player_rush_yds': (20, 90),
+    'player_rush_tds': (0.5, 0.5),
+    'player_solo_tackles': (1.5, 6.5),
+}
+
+
+@dataclass
+class FakeOddsConfig:
+    sport: str = NBA
+    games: int = 10
+    markets: list[str] = None
+    bookmakers: list[str] = field(default_factory=lambda: DFS_BOOKS + SHARP_BOOKS)
+    players_per_team: int = 8
+    coverage: float = 0.85
+    vig: float = 0.045
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after_seconds: int = 1
+    move_rate: float = 0.1
+    quota: int = 20000
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.markets is None:
+            self.markets = SPORT_MARKETS[self.sport].split(',')
+
+
+class FakeSlate:
+    """
+    Synthetic slate of games with player-prop odds for every configured bookmaker.
+
+    Each player/market has a hidden true mean and std dev. Sharp books post a line near
+    the mean priced off a normal distribution plus vig; DFS books post the same or a
+    nearby line at a flat price.
+    """
+
+    def __init__(self, config: FakeOddsConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.events = []
+        self.odds = {}
+
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        sport_title = SPORT_TITLES.get(config.sport, config.sport)
+        for i in range(config.games):
+            event_id = hashlib.md5(f'{config.sport}-{config.seed}-{i}'.encode()).hexdigest()
+            event = {
+                'id': event_id,
+                'sport_key': config.sport,
+                'sport_title': sport_title,
+                'commence_time': (start + timedelta(minutes=30 * i)).isoformat().replace('+00:00', 'Z'),
+                'home_team': f'{sport_title} Home {i + 1}',
+                'away_team': f'{sport_title} Away {i + 1}',
+            }
+            self.events.append(event)
+            self.odds[event_id] = self._build_odds(event)
+
+    def _timestamp(self) -> str:
+        return datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+    def _build_odds(self, event: dict) -> dict:
+        config = self.config
+        players = [
+            f"{event[team]} Player {n + 1}"
+            for team in ('home_team', 'away_team') for n in range(config.players_per_team)
+        ]
+
+        # Hidden truth per player/market
+        truth = {}
+        for market in config.markets:
+            low, high = MARKET_LINE_RANGES.get(market, (0.5, 20.5))
+            for player in players:
+                if self.random.random() < config.coverage:
+                    mean = self.random.uniform(low, high)
+                    truth[(player, market)] = (mean, max(mean * 0.35, 0.6))
+
+        now = self._timestamp()
+        bookmakers = []
+        for book in config.bookmakers:
+            markets = []
+            for market in config.markets:
+                outcomes = []
+                for player in players:
+                    if (player, market) not in truth or self.random.random() > config.coverage:
+                        continue
+                    outcomes.extend(self._price_outcomes(book, player, *truth[(player, market)]))
+                if outcomes:
+                    markets.append({'key': market, 'last_update': now, 'outcomes': outcomes})
+            if markets:
+                bookmakers.append({
+                    'key': book,
+                    'title': BOOKMAKER_TITLES.get(book, book),
+                    'last_update': now,
+                    'markets': markets,
+                })
+
+        return {**event, 'bookmakers': bookmakers}
+
+    def _price_outcomes(self, book: str, player: str, mean: float, std: float) -> list[dict]:
+        line = max(math.floor(mean + self.random.gauss(0, std * 0.1)) + 0.5, 0.5)
+        if book in DFS_BOOKS:
+            line = max(line + self.random.choice([0, 0, 0, -1, 1]), 0.5)
+            over_price = under_price = 1.82
+        else:
+            p_over = min(max(float(pricing_math.over_probability(line, mean, std)), 0.05), 0.95)
+            over_price = round(1 / (p_over * (1 + self.config.vig)), 2)
+            under_price = round(1 / ((1 - p_over) * (1 + self.config.vig)), 2)
+        return [
+            {'name': 'Over', 'description': player, 'price': over_price, 'point': line},
+            {'name': 'Under', 'description': player, 'price': under_price, 'point': line},
+        ]
+
+    def move_lines(self, event_id: str) -> None:
+        """Nudge a few sharp prices so consecutive fetches are not identical."""
+        with self._lock:
+            now = self._timestamp()
+            for bookmaker in self.odds[event_id]['bookmakers']:
+                if bookmaker['key'] in DFS_BOOKS:
+                    continue
+                for market in bookmaker['markets']:
+                    if self.random.random() < 0.2:
+                        for outcome in market['outcomes']:
+                            outcome['price'] = round(max(outcome['price'] + self.random.choice([-0.03, 0.03]), 1.01), 2)
+                        market['last_update'] = now
+                        bookmaker['last_update'] = now
+
+    def event_odds(self, event_id: str, markets: list[str], bookmakers: list[str]) -> dict:
+        """Event odds filtered to the requested markets and bookmakers."""
+        with self._lock:
+            odds = self.odds[event_id]
+            filtered = []
+            for bookmaker in odds['bookmakers']:
+                if bookmakers and bookmaker['key'] not in bookmakers:
+                    continue
+                book_markets = [m for m in bookmaker['markets'] if not markets or m['key'] in markets]
+                if book_markets:
+                    filtered.append({**bookmaker, 'markets': book_markets})
+            return {**{k: v for k, v in odds.items() if k != 'bookmakers'}, 'bookmakers': filtered}
+
+
+def create_app(config: FakeOddsConfig) -> FastAPI:
+    app = FastAPI(title="Fake Odds API", description="Local stand-in for The Odds API v4")
+    slate = FakeSlate(config)
+    usage = {}
+    usage_lock = threading.Lock()
+    app.state.slate = slate
+    app.state.usage = usage
+
+    def charge(api_key: str, cost: int):
+        """Charge a request to an API key. Returns (headers, error_response)."""
+        with usage_lock:
+            used = usage.get(api_key, 0)
+            if used + cost > config.quota:
+                return None, JSONResponse(
+                    status_code=401,
+                    content={'message': 'Usage quota has been reached', 'error_code': 'OUT_OF_USAGE_CREDITS'},
+                    headers={'x-requests-remaining': str(config.quota - used), 'x-requests-used': str(used), 'x-requests-last': '0'}
+                )
+            usage[api_key] = used + cost
+            return {
+                'x-requests-remaining': str(config.quota - usage[api_key]),
+                'x-requests-used': str(usage[api_key]),
+                'x-requests-last': str(cost),
+            }, None
+
+    async def simulate_network():
+        """Sleep for the configured latency and maybe return a 429."""
+        delay = config.latency_ms + random.uniform(-1, 1) * config.latency_jitter_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if config.rate_limit_rate > 0 and random.random() < config.rate_limit_rate:
+            return JSONResponse(
+                status_code=429,
+                content={'message': 'Requests are being sent too frequently', 'error_code': 'EXCEEDED_FREQ_LIMIT'},
+                headers={'Retry-After': str(config.retry_after_seconds)}
+            )
+        return None
+
+    def unauthorized():
+        return JSONResponse(status_code=401, content={'message': 'API key is missing or invalid', 'error_code': 'MISSING_KEY'})
+
+    @app.get("/v4/sports/{sport}/events")
+    async def get_events(sport: str, apiKey: str = Query(None), commenceTimeTo: str = Query(None)):
+        if not apiKey:
+            return unauthorized()
+        error = await simulate_network()
+        if error is not None:
+            return error
+        headers, error = charge(apiKey, 0)
+        if error is not None:
+            return error
+
+        events = [e for e in slate.events if e['sport_key'] == sport]
+        if commenceTimeTo:
+            events = [e for e in events if e['commence_time'] <= commenceTimeTo]
+        return JSONResponse(content=events, headers=headers)
+
+    @app.get("/v4/sports/{sport}/events/{event_id}/odds")
+    async def get_event_odds(sport: str, event_id: str, apiKey: str = Query(None), regions: str = Query(None),
+                             markets: str = Query(None), oddsFormat: str = Query('decimal'),
+                             bookmakers: str = Query(None)):
+        if not apiKey:
+            return unauthorized()
+        if event_id not in slate.odds or slate.odds[event_id]['sport_key'] != sport:
+            return JSONResponse(status_code=404, content={'message': 'Event not found', 'error_code': 'EVENT_NOT_FOUND'})
+        error = await simulate_network()
+        if error is not None:
+            return error
+
+        if random.random() < config.move_rate:
+            slate.move_lines(event_id)
+
+        market_list = [m for m in (markets or '').split(',') if m]
+        book_list = [b for b in (bookmakers or '').split(',') if b]
+        odds = slate.event_odds(event_id, market_list, book_list)
+
+        # Billed like the real API: markets returned x regions (10 bookmakers = 1 region)
+        markets_returned = {m['key'] for b in odds['bookmakers'] for m in b['markets']}
+        if book_list:
+            region_count = math.ceil(len(book_list) / 10)
+        else:
+            region_count = len([r for r in (regions or 'us').split(',') if r])
+        headers, error = charge(apiKey, len(markets_returned) * region_count)
+        if error is not None:
+            return error
+
+        return JSONResponse(content=odds, headers=headers)
+
+    def historical(date: str, data) -> dict:
+        """Wrap a response the way the historical endpoints do (snapshots every 5 minutes)."""
+        when = datetime.fromisoformat(date.replace('Z', '+00:00')).replace(second=0, microsecond=0)
+        when -= timedelta(minutes=when.minute % 5)
+        stamp = lambda t: t.isoformat().replace('+00:00', 'Z')
+        return {
+            'timestamp': stamp(when),
+            'previous_timestamp': stamp(when - timedelta(minutes=5)),
+            'next_timestamp': stamp(when + timedelta(minutes=5)),
+            'data': data,
+        }
+
+    @app.get("/v4/historical/sports/{sport}/events")
+    async def get_historical_events(sport: str, date: str, apiKey: str = Query(None)):
+        if not apiKey:
+            return unauthorized()
+        error = await simulate_network()
+        if error is not None:
+            return error
+        headers, error = charge(apiKey, 1)
+        if error is not None:
+            return error
+
+        # The synthetic slate is listed at every timestamp
+        events = [e for e in slate.events if e['sport_key'] == sport]
+        return JSONResponse(content=historical(date, events), headers=headers)
+
+    @app.get("/v4/historical/sports/{sport}/events/{event_id}/odds")
+    async def get_historical_event_odds(sport: str, event_id: str, date: str, apiKey: str = Query(None),
+                                        regions: str = Query(None), markets: str = Query(None),
+                                        oddsFormat: str = Query('decimal'), bookmakers: str = Query(None)):
+        if not apiKey:
+            return unauthorized()
+        if event_id not in slate.odds or slate.odds[event_id]['sport_key'] != sport:
+            return JSONResponse(status_code=404, content={'message': 'Event not found', 'error_code': 'EVENT_NOT_FOUND'})
+        error = await simulate_network()
+        if error is not None:
+            return error
+
+        market_list = [m for m in (markets or '').split(',') if m]
+        book_list = [b for b in (bookmakers or '').split(',') if b]
+        odds = slate.event_odds(event_id, market_list, book_list)
+
+        # Historical odds cost 10x the live price
+        markets_returned = {m['key'] for b in odds['bookmakers'] for m in b['markets']}
+        if book_list:
+            region_count = math.ceil(len(book_list) / 10)
+        else:
+            region_count = len([r for r in (regions or 'us').split(',') if r])
+        headers, error = charge(apiKey, 10 * len(markets_returned) * region_count)
+        if error is not None:
+            return error
+
+        return JSONResponse(content=historical(date, odds), headers=headers)
+
+    @app.get("/usage")
+    async def get_usage():
+        """Quota used per API key (stand-in only, not part of the real API)."""
+        with usage_lock:
+            return {'quota': config.quota, 'used': dict(usage)}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Local stand-in for The Odds API')
+    parser.add_argument('--sport', choices=['nfl', 'nba'], default='nba', help='Sport to generate a slate for (default: nba)')
+    parser.add_argument('--games', type=int, default=10, help='Number of games in the slate (default: 10)')
+    parser.add_argument('--markets', type=str, default=None, help='Comma-separated markets (default: the scheduler markets for the sport)')
+    parser.add_argument('--bookmakers', type=str, default=','.join(DFS_BOOKS + SHARP_BOOKS), help='Comma-separated bookmakers')
+    parser.add_argument('--players-per-team', type=int, default=8, help='Players with props per team (default: 8)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Injected response latency in ms (default: 0)')
+    parser.add_argument('--latency-jitter-ms', type=float, default=0.0, help='Uniform +/- jitter on the latency in ms (default: 0)')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with 429 (default: 0)')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429s (default: 1)')
+    parser.add_argument('--move-rate', type=float, default=0.1, help='Chance a fetch moves some sharp lines (default: 0.1)')
+    parser.add_argument('--quota', type=int, default=20000, help='Request quota per API key (default: 20000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the slate (default: 0)')
+    parser.add_argument('--port', type=int, default=8001, help='Port to listen on (default: 8001)')
+    args = parser.parse_args()
+
+    config = FakeOddsConfig(
+        sport=NFL if args.sport == 'nfl' else NBA,
+        games=args.games,
+        markets=args.markets.split(',') if args.markets else None,
+        bookmakers=args.bookmakers.split(','),
+        players_per_team=args.players_per_team,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_seconds=args.retry_after,
+        move_rate=args.move_rate,
+        quota=args.quota,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host="127.0.0.1", port=args.port)
@@ -1,9 +1,18 @@
 import os
+import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from Game import Game
+from odds_layout import OddsDictionary
 from nfl_data import NFLData
 from nba_data import NBAData
+from quota_budget import QuotaBudget
+from odds_archive import ArchiveWriter
+from api_key_pool import ApiKeyPool, parse_api_keys, mask_key
+from rate_limiter import TokenBucket, RETRYABLE_STATUS_CODES, ODDS_API_MAX_RETRIES, retry_after_seconds, backoff_seconds
 
 NFL = 'americanfootball_nfl'
 NBA = 'basketball_nba'
@@ -13,66 +22,473 @@ NBA_MARKETS = 'player_points,player_rebounds,player_assists,player_threes,player
 
 load_dotenv()
 API_KEY = os.getenv('API_KEY')
+# Optional comma-separated pool of keys; requests go to the key with the most quota left
+API_KEYS = os.getenv('API_KEYS')
+# Point at a local stand-in (e.g. fake_odds_api.py) with ODDS_API_BASE_URL=http://localhost:8001/v4
+ODDS_API_BASE_URL = os.getenv('ODDS_API_BASE_URL', 'https://api.the-odds-api.com/v4')
+FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', '8'))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv('REQUEST_TIMEOUT_SECONDS', '30'))
+# How long a DFS books' odds snapshot is reused before it is fetched again
+DFS_SNAPSHOT_TTL_SECONDS = float(os.getenv('DFS_SNAPSHOT_TTL_SECONDS', '900'))
+# Extra passes get_games makes over events whose fetch still failed after retries
+ODDS_API_REQUEUE_ROUNDS = int(os.getenv('ODDS_API_REQUEUE_ROUNDS', '2'))
 
-def get_events(sport, commence_time_to) -> dict:
-    events_response = requests.get(f'https://api.the-odds-api.com/v4/sports/{sport}/events', params={
-        'apiKey': API_KEY,
-        'commenceTimeTo': commence_time_to
-    })
 
-    if events_response.status_code != 200:
-        print(f'Failed to get events: status_code {events_response.status_code}, response body {events_response.text}')
+def game_from_odds_json(odds_json: dict, markets, bookmakers, sport_data: NFLData | NBAData,
+                        odds_dictionary: OddsDictionary = None) -> Game:
+    """
+    Build a Game from an event odds response (live or archived).
 
-    else:
-        events_json = events_response.json()
-        return events_json
+    Games of one slate should share an odds_dictionary so their categoricals share codes.
 
+    Returns:
+        Game: The game, or None if no bookmakers offered odds for it
+    """
+    if len(odds_json['bookmakers']) == 0:
+        print(f'No bookmakers found for event {odds_json["id"]},  home_team: {odds_json["home_team"]}, away_team: {odds_json["away_team"]}')
+        return None
 
-def get_game(sport, event_id, reigons, markets, odds_format, bookmakers, sport_data: NFLData | NBAData) -> Game:
-    odds_response = requests.get(f'https://api.the-odds-api.com/v4/sports/{sport}/events/{event_id}/odds', params={
-    'apiKey': API_KEY,
-    'regions': reigons,
-    'markets': markets,
-    'oddsFormat': odds_format,
-    'bookmakers': bookmakers
-    })
-
-    if odds_response.status_code != 200:
-        print(f'Failed to get odds: status_code {odds_response.status_code}, response body {odds_response.text}')
-
-    else:
+    return Game(odds_json['id'], odds_json['sport_key'], odds_json['sport_title'], odds_json['commence_time'], odds_json['home_team'], odds_json['away_team'], odds_json['bookmakers'], markets, bookmakers, sport_data,
+                odds_dictionary=odds_dictionary)
+
+
+class DfsSnapshotCache:
+    """
+    Latest DFS bookmaker odds per event, reused between sharp-line refreshes.
+
+    DFS books (PrizePicks, Underdog, ...) move their lines rarely and their price is
+    fixed, so their odds only need fetching every ttl_seconds while the sharp books are
+    fetched on every refresh. A snapshot serves any request for a subset of the markets
+    it was fetched with. Callers that know an event's refresh cadence pass a per-event
+    max_age_seconds instead (the refresh loop reuses a snapshot for a fixed number of
+    refreshes), so distant games on slow tiers are not refetched on every refresh.
+    """
+
+    def __init__(self, ttl_seconds: float = DFS_SNAPSHOT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, sport: str, event_id: str, markets: str, max_age_seconds: float = None) -> tuple[list, bool]:
+        """
+        Cached DFS bookmakers for an event, limited to the requested markets.
+
+        Returns:
+            tuple: (bookmakers, fresh) - bookmakers is None if nothing usable is cached,
+                   fresh is False once the snapshot is older than max_age_seconds
+                   (default: ttl_seconds)
+        """
+        requested = set(m for m in markets.split(',') if m)
+        with self._lock:
+            entry = self._entries.get((sport, event_id))
+        if entry is None or not requested <= entry['markets']:
+            return None, False
+
+        fresh = time.monotonic() - entry['fetched_at'] < (max_age_seconds or self.ttl_seconds)
+        if requested == entry['markets']:
+            return entry['bookmakers'], fresh
+        bookmakers = [
+            {**bookmaker, 'markets': [market for market in bookmaker['markets'] if market['key'] in requested]}
+            for bookmaker in entry['bookmakers']
+        ]
+        return bookmakers, fresh
+
+    def put(self, sport: str, event_id: str, markets: str, bookmakers: list, max_age_seconds: float = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._entries[(sport, event_id)] = {
+                'bookmakers': bookmakers,
+                'markets': set(m for m in markets.split(',') if m),
+                'fetched_at': now,
+                'keep_seconds': 4 * max(max_age_seconds or 0, self.ttl_seconds)
+            }
+            # Drop snapshots of events that are no longer being refreshed
+            expired = [key for key, entry in self._entries.items() if now - entry['fetched_at'] > entry['keep_seconds']]
+            for key in expired:
+                del self._entries[key]
+
+
+class OddsApiClient:
+    """
+    Client for The Odds API backed by a pooled keep-alive session.
+
+    One client should be created per process and reused, so connections (and their
+    TLS handshakes) are shared across requests and scheduler cycles.
+
+    Every request takes a token from a shared TokenBucket, so concurrent fetches never
+    burst past the provider's rate limit. Rate-limited (429) and transient 5xx/network
+    failures are retried, honoring Retry-After or backing off with jitter.
+
+    Requests are spread over an ApiKeyPool (API_KEYS, or just API_KEY): each goes to the
+    key with the most quota left, and a key that runs out of credits fails over to the
+    next.
+    """
+
+    def __init__(self, api_key: str | list[str] = None, base_url: str = ODDS_API_BASE_URL,
+                 pool_size: int = FETCH_CONCURRENCY, timeout: float = REQUEST_TIMEOUT_SECONDS,
+                 budget: QuotaBudget = None, archive: ArchiveWriter = None,
+                 limiter: TokenBucket = None, max_retries: int = ODDS_API_MAX_RETRIES,
+                 requeue_rounds: int = ODDS_API_REQUEUE_ROUNDS,
+                 dfs_ttl_seconds: float = DFS_SNAPSHOT_TTL_SECONDS):
+        if isinstance(api_key, str):
+            api_key = parse_api_keys(api_key)
+        self.key_pool = ApiKeyPool(api_key or parse_api_keys(API_KEYS) or parse_api_keys(API_KEY))
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.budget = budget
+        self.archive = archive
+        self.limiter = limiter or TokenBucket()
+        self.max_retries = max_retries
+        self.requeue_rounds = requeue_rounds
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.total_request_seconds = 0.0
+        self.max_request_seconds = 0.0
+        self.retry_count = 0
+
+        self.dfs_cache = DfsSnapshotCache(ttl_seconds=dfs_ttl_seconds)
+
+    def _send(self, path: str, params: dict) -> requests.Response:
+        """Send one GET request on the pooled session with the best key and record how long it took."""
+        self.limiter.acquire()
+        api_key = self.key_pool.acquire()
+        start = time.perf_counter()
+        try:
+            response = self.session.get(f'{self.base_url}{path}', params={'apiKey': api_key, **params}, timeout=self.timeout)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.key_pool.release(api_key)
+            with self._lock:
+                self.request_count += 1
+                self.total_request_seconds += elapsed
+                self.max_request_seconds = max(self.max_request_seconds, elapsed)
+
+        response.elapsed_seconds = elapsed
+        response.api_key = api_key
+        response.key_exhausted = self.key_pool.record(
+            api_key, response.status_code, response.headers, response.text if response.status_code == 401 else ''
+        )
+        if self.budget is not None:
+            # The budget plans against the quota left across every key
+            self.budget.record(self.key_pool.quota_headers())
+        return response
+
+    def _get(self, path: str, params: dict) -> requests.Response:
+        """
+        GET with rate limiting and retries.
+
+        429s pause the shared limiter for Retry-After (or a jittered backoff) and slow
+        its rate; 5xx responses and connection errors back off with jitter. After
+        max_retries the last response is returned, or the last error re-raised.
+        A key that is out of credits is retried straight away on another key.
+        """
+        attempt = 0
+        failovers = 0
+        while True:
+            try:
+                response = self._send(path, params)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = backoff_seconds(attempt)
+                print(f'Request to {path} failed ({e.__class__.__name__}), retrying in {wait:.1f}s')
+            else:
+                if (response.key_exhausted and failovers < len(self.key_pool)
+                        and self.key_pool.has_available(exclude=response.api_key)):
+                    failovers += 1
+                    print(f'API key {mask_key(response.api_key)} is out of credits, failing over to another key')
+                    continue
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    self.limiter.on_success()
+                    return response
+                if attempt == self.max_retries:
+                    return response
+
+                wait = backoff_seconds(attempt)
+                if response.status_code == 429:
+                    self.limiter.on_throttled()
+                    retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                    if retry_after is not None:
+                        wait = retry_after
+                    # Every thread waits, not just this one
+                    self.limiter.pause(wait)
+                print(f'Request to {path} returned {response.status_code}, retrying in {wait:.1f}s')
+
+            with self._lock:
+                self.retry_count += 1
+            time.sleep(wait)
+            attempt += 1
+
+    def get_events(self, sport, commence_time_to) -> dict:
+        events_response = self._get(f'/sports/{sport}/events', {
+            'commenceTimeTo': commence_time_to
+        })
+
+        if events_response.status_code != 200:
+            print(f'Failed to get events: status_code {events_response.status_code}, response body {events_response.text}')
+
+        else:
+            if self.archive is not None:
+                self.archive.record('events', sport, None, events_response.content)
+            events_json = events_response.json()
+            return events_json
+
+    def _fetch_odds(self, sport, event_id, reigons, markets, odds_format, bookmakers, archive_kind='odds') -> tuple[dict, bool]:
+        """
+        Fetch the raw odds for one event.
+
+        Args:
+            archive_kind: Kind the response is archived under ('odds' for a full snapshot,
+                          'odds_sharp' / 'odds_dfs' for one side of a split refresh)
+
+        Returns:
+            tuple: (odds_json, retryable) - odds_json is None on failure, and retryable says
+                   whether the failure was transient (rate limit, server or network error)
+        """
+        try:
+            odds_response = self._get(f'/sports/{sport}/events/{event_id}/odds', {
+                'regions': reigons,
+                'markets': markets,
+                'oddsFormat': odds_format,
+                'bookmakers': bookmakers
+            })
+        except (requests.ConnectionError, requests.Timeout) as e:
+            print(f'Failed to get odds for event {event_id}: {e}')
+            return None, True
+
+        if odds_response.status_code != 200:
+            print(f'Failed to get odds: status_code {odds_response.status_code}, response body {odds_response.text}')
+            return None, odds_response.status_code in RETRYABLE_STATUS_CODES
+
+        if self.archive is not None:
+            self.archive.record(archive_kind, sport, event_id, odds_response.content)
         odds_json = odds_response.json()
 
         # Check the usage quota
+        print(f'Fetched odds for event {event_id} in {odds_response.elapsed_seconds:.3f}s')
         print('Remaining requests', odds_response.headers['x-requests-remaining'])
         print('Used requests', odds_response.headers['x-requests-used'])
-        
-        if len(odds_json['bookmakers']) == 0:
-            print(f'No bookmakers found for event {odds_json["id"]},  home_team: {odds_json["home_team"]}, away_team: {odds_json["away_team"]}')
+        return odds_json, False
+
+    def _dfs_bookmakers(self, sport, event_id, reigons, markets, odds_format, dfs_bookmakers,
+                        max_age_seconds: float = None) -> tuple[list, bool]:
+        """
+        DFS bookmaker odds for an event, from the snapshot cache when it is fresh.
+
+        A stale snapshot is still used if refetching it fails.
+
+        Returns:
+            tuple: (bookmakers, retryable) as for _fetch_odds
+        """
+        cached, fresh = self.dfs_cache.get(sport, event_id, markets, max_age_seconds)
+        if fresh:
+            return cached, False
+
+        odds_json, retryable = self._fetch_odds(sport, event_id, reigons, markets, odds_format, dfs_bookmakers, 'odds_dfs')
+        if odds_json is None:
+            return cached, retryable if cached is None else False
+        self.dfs_cache.put(sport, event_id, markets, odds_json['bookmakers'], max_age_seconds)
+        return odds_json['bookmakers'], False
+
+    def get_game(self, sport, event_id, reigons, markets, odds_format, bookmakers, sport_data: NFLData | NBAData) -> Game:
+        odds_json, _ = self._fetch_odds(sport, event_id, reigons, markets, odds_format, bookmakers)
+        if odds_json is not None:
+            return game_from_odds_json(odds_json, markets, bookmakers, sport_data)
+
+    def get_games(self, sport, event_ids, reigons, markets, odds_format, bookmakers, sport_data: NFLData | NBAData,
+                  max_workers: int = None, dfs_bookmakers: str = None, dfs_max_age: dict = None) -> dict:
+        """
+        Fetch event odds for many events concurrently and build a Game for each.
+
+        Requests run on a thread pool capped at max_workers (defaults to the session
+        pool size), so at most that many calls to the Odds API are in flight at once.
+        Events whose fetch failed transiently (even after the per-request retries) are
+        requeued and fetched again, up to requeue_rounds more passes.
+
+        With dfs_bookmakers the refresh is split by bookmaker cadence: `bookmakers` (the
+        sharp books) are fetched every call, the DFS books only when their cached snapshot
+        is older than dfs_ttl_seconds (or the event's dfs_max_age), and each Game is built from the latest sharp odds
+        merged with the cached DFS odds.
+
+        Args:
+            event_ids: Event IDs to fetch odds for
+            bookmakers: Comma-separated bookmakers fetched on every call
+            max_workers: Maximum number of concurrent requests
+            dfs_bookmakers: Comma-separated DFS bookmakers served from the snapshot cache
+            dfs_max_age: Optional mapping of event_id -> max DFS snapshot age in seconds
+
+        Returns:
+            dict: Mapping of event_id -> Game (or None if the fetch failed or had no bookmakers),
+                  in the same order as event_ids
+        """
+        games = {}
+        if not event_ids:
+            return games
+
+        archive_kind = 'odds_sharp' if dfs_bookmakers else 'odds'
+        odds_dictionary = OddsDictionary()
+        bookmaker_keys = f'{dfs_bookmakers},{bookmakers}' if dfs_bookmakers else bookmakers
+
+        def fetch_game(event_id):
+            # DFS side first, so an archive replays each refresh as DFS snapshot then sharp odds
+            dfs_books = []
+            if dfs_bookmakers:
+                dfs_books, retryable = self._dfs_bookmakers(sport, event_id, reigons, markets, odds_format, dfs_bookmakers,
+                                                            (dfs_max_age or {}).get(event_id))
+                if dfs_books is None:
+                    return None, retryable
+            odds_json, retryable = self._fetch_odds(sport, event_id, reigons, markets, odds_format, bookmakers, archive_kind)
+            if odds_json is None:
+                return None, retryable
+            if dfs_bookmakers:
+                odds_json = {**odds_json, 'bookmakers': dfs_books + odds_json['bookmakers']}
+            return game_from_odds_json(odds_json, markets, bookmaker_keys, sport_data, odds_dictionary), False
+
+        max_workers = max_workers or self.pool_size
+        pending = list(event_ids)
+        for round_number in range(self.requeue_rounds + 1):
+            if round_number > 0:
+                print(f'Requeueing {len(pending)} events for {sport} (pass {round_number + 1})')
+                time.sleep(backoff_seconds(round_number))
+
+            requeue = []
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as executor:
+                futures = {executor.submit(fetch_game, event_id): event_id for event_id in pending}
+                for future in as_completed(futures):
+                    event_id = futures[future]
+                    try:
+                        games[event_id], retryable = future.result()
+                    except Exception as e:
+                        print(f'Failed to get game {event_id}: {e}')
+                        games[event_id], retryable = None, False
+                    if retryable:
+                        requeue.append(event_id)
+
+            requeue = set(requeue)
+            pending = [event_id for event_id in event_ids if event_id in requeue]
+            if not pending:
+                break
+
+        if pending:
+            print(f'Gave up on {len(pending)} events for {sport} after {self.requeue_rounds + 1} passes')
+
+        return {event_id: games[event_id] for event_id in event_ids}
+
+    def get_historical_events(self, sport, date) -> dict:
+        """
+        Events as listed at a past timestamp (paid plans only).
+
+        Returns:
+            dict: timestamp, previous_timestamp, next_timestamp and data (the events), or None on failure
+        """
+        try:
+            response = self._get(f'/historical/sports/{sport}/events', {'date': date})
+        except (requests.ConnectionError, requests.Timeout) as e:
+            print(f'Failed to get historical events for {sport} at {date}: {e}')
             return None
-        
-        return Game(odds_json['id'], odds_json['sport_key'], odds_json['sport_title'], odds_json['commence_time'], odds_json['home_team'], odds_json['away_team'], odds_json['bookmakers'], markets, bookmakers, sport_data)
+
+        if response.status_code != 200:
+            print(f'Failed to get historical events: status_code {response.status_code}, response body {response.text}')
+            return None
+        return response.json()
+
+    def get_historical_event_odds(self, sport, event_id, date, reigons, markets, odds_format, bookmakers) -> dict:
+        """
+        Odds for one event as they were at a past timestamp (paid plans only).
+
+        Quota cost is 10 x markets x regions per call.
+
+        Returns:
+            dict: timestamp, previous_timestamp, next_timestamp and data (the event odds), or None on failure
+        """
+        try:
+            response = self._get(f'/historical/sports/{sport}/events/{event_id}/odds', {
+                'date': date,
+                'regions': reigons,
+                'markets': markets,
+                'oddsFormat': odds_format,
+                'bookmakers': bookmakers
+            })
+        except (requests.ConnectionError, requests.Timeout) as e:
+            print(f'Failed to get historical odds for event {event_id} at {date}: {e}')
+            return None
+
+        if response.status_code != 200:
+            print(f'Failed to get historical odds: status_code {response.status_code}, response body {response.text}')
+            return None
+        return response.json()
+
+    def key_usage(self) -> list[dict]:
+        """Per-key quota usage and burn rate (see ApiKeyPool.usage)."""
+        return self.key_pool.usage()
+
+    def timing_summary(self) -> dict:
+        """
+        Get request timing statistics for this client.
+
+        Returns:
+            dict: request_count, total_seconds, avg_seconds, max_seconds, retry_count,
+                  throttled_count and the limiter's current rate_per_second
+        """
+        with self._lock:
+            return {
+                'request_count': self.request_count,
+                'total_seconds': self.total_request_seconds,
+                'avg_seconds': self.total_request_seconds / self.request_count if self.request_count else 0.0,
+                'max_seconds': self.max_request_seconds,
+                'retry_count': self.retry_count,
+                'throttled_count': self.limiter.throttled_count,
+                'rate_per_second': self.limiter.rate
+            }
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+
+def get_client() -> OddsApiClient:
+    """Get the process-wide OddsApiClient, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        _default_client = OddsApiClient()
+    return _default_client
+
+def get_events(sport, commence_time_to) -> dict:
+    return get_client().get_events(sport, commence_time_to)
+
+def get_game(sport, event_id, reigons, markets, odds_format, bookmakers, sport_data: NFLData | NBAData) -> Game:
+    return get_client().get_game(sport, event_id, reigons, markets, odds_format, bookmakers, sport_data)
+
+def get_games(sport, event_ids, reigons, markets, odds_format, bookmakers, sport_data: NFLData | NBAData, max_workers: int = FETCH_CONCURRENCY) -> dict:
+    return get_client().get_games(sport, event_ids, reigons, markets, odds_format, bookmakers, sport_data, max_workers)
 
 def main():
     events_json = get_events('americanfootball_nfl', '2026-01-12T20:00:00Z')
     print(events_json)
     nfl_data = NFLData()
 
-    for event in events_json:
-        odds_params = (
-            'americanfootball_nfl',
-            event['id'],
-            'us,us_dfs',
-            NFL_MARKETS,
-            #'player_pass_attempts,player_pass_completions,player_pass_yds,player_receptions,player_reception_yds,player_rush_attempts,player_rush_yds',
-            'decimal',
-            #'prizepicks,underdog,fanduel,draftkings,betmgm,espnbet,hardrockbet'
-            'prizepicks,underdog,betr_us_dfs,pick6,fanduel,draftkings',
-            nfl_data
-        )
+    games = get_games(
+        'americanfootball_nfl',
+        [event['id'] for event in events_json],
+        'us,us_dfs',
+        NFL_MARKETS,
+        #'player_pass_attempts,player_pass_completions,player_pass_yds,player_receptions,player_reception_yds,player_rush_attempts,player_rush_yds',
+        'decimal',
+        #'prizepicks,underdog,fanduel,draftkings,betmgm,espnbet,hardrockbet'
+        'prizepicks,underdog,betr_us_dfs,pick6,fanduel,draftkings',
+        nfl_data
+    )
 
-        game = get_game(*odds_params)
-        
+    for game in games.values():
         if game is not None:
             print(game)
             nfl_data.games.append(game)
@@ -84,18 +500,17 @@ def main_nba():
     print(events_json)
     nba_data = NBAData()
 
-    for event in events_json:
-        odds_params = (
-            'basketball_nba',
-            event['id'],
-            'us',
-            NBA_MARKETS,
-            'decimal',
-            'prizepicks,underdog,betr_us_dfs,pick6,fanduel,draftkings',
-            nba_data
-        )
+    games = get_games(
+        'basketball_nba',
+        [event['id'] for event in events_json],
+        'us',
+        NBA_MARKETS,
+        'decimal',
+        'prizepicks,underdog,betr_us_dfs,pick6,fanduel,draftkings',
+        nba_data
+    )
 
-        game = get_game(*odds_params)
+    for game in games.values():
         if game is not None:
             print(game)
             #print(game.odds_df)
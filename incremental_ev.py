@@ -0,0 +1,196 @@
+import os
+import copy
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from odds_fingerprint import FINGERPRINT_MAX_AGE_MINUTES
+from slate_ev import CATEGORICAL_COLUMNS
+from parallel_ev import find_plus_ev_parallel
+from pricing_log import logger
+
+# Reprice the whole game when more than this share of its player/market keys changed
+INCREMENTAL_MAX_CHANGED_FRACTION = float(os.getenv('INCREMENTAL_MAX_CHANGED_FRACTION', '0.5'))
+
+ODDS_KEY_COLUMNS = ['bookmaker', 'market', 'player', 'outcome', 'line', 'price']
+PRICING_KEY_COLUMNS = ['player', 'market']
+BET_KEY_COLUMNS = ['bookmaker', 'market', 'player', 'outcome', 'betting_line']
+BET_VALUE_COLUMNS = ['sharp_mean', 'implied_means', 'std_dev', 'sample_size', 'mean_diff', 'ev_percent', 'price', 'true_prob']
+
+
+def _row_hashes(df: pd.DataFrame, columns: list[str]) -> np.ndarray:
+    """One uint64 hash per row of the given columns."""
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for column in columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Hash the (few) category values and pick by code, so frames with different
+            # category sets still hash equal values equally. Python's str hash is only
+            # stable within a process, which is all the pricer's state needs.
+            categories = np.array([hash(value) for value in values.cat.categories], dtype=np.int64).view(np.uint64)
+            column_hashes = categories[values.cat.codes.to_numpy()]
+        else:
+            column_hashes = pd.util.hash_array(values.to_numpy())
+        hashes = hashes * np.uint64(1000003) ^ column_hashes
+    return hashes
+
+
+def _values_differ(old: pd.Series, new: pd.Series) -> np.ndarray:
+    old = old.to_numpy()
+    new = new.to_numpy()
+    if old.dtype.kind == 'f' and new.dtype.kind == 'f':
+        return ~((old == new) | (np.isnan(old) & np.isnan(new)))
+    return np.array([a != b for a, b in zip(old, new)], dtype=bool)
+
+
+def diff_bets(old: pd.DataFrame, new: pd.DataFrame) -> dict:
+    """
+    Change set between two EV bet frames of one game, keyed on
+    (bookmaker, market, player, outcome, betting_line).
+
+    Returns:
+        dict: 'added' and 'updated' (rows of new to upsert) and 'removed' (key columns of
+              rows of old that are gone)
+    """
+    old_hashes = _row_hashes(old, BET_KEY_COLUMNS)
+    new_hashes = _row_hashes(new, BET_KEY_COLUMNS)
+    in_old = np.isin(new_hashes, old_hashes)
+
+    changes = {
+        'added': new[~in_old] if len(new) else pd.DataFrame(),
+        'updated': pd.DataFrame(),
+        'removed': old[~np.isin(old_hashes, new_hashes)][BET_KEY_COLUMNS] if len(old) else pd.DataFrame(),
+    }
+    if in_old.any():
+        common = new[in_old]
+        old_rows = pd.Series(np.arange(len(old)), index=old_hashes)
+        previous = old.iloc[old_rows[new_hashes[in_old]].to_numpy()]
+        updated = np.zeros(len(common), dtype=bool)
+        for column in BET_VALUE_COLUMNS:
+            updated |= _values_differ(previous[column], common[column])
+        changes['updated'] = common[updated]
+    return changes
+
+
+class IncrementalPricer:
+    """
+    Prices a slate of games, repricing only the player/market keys whose odds moved.
+
+    The previous cycle's odds rows (bookmaker, market, player, outcome, line, price) and
+    EV bets are kept per game. A changed row marks its (player, market) as affected; since
+    devigging, sharp means and std devs never cross player/market keys, the affected keys
+    are repriced on their own and the rest of the previous result is kept. Games seen for
+    the first time, with most keys changed, with reloaded stats, or last fully priced
+    more than max_age_minutes ago are repriced in full.
+    """
+
+    def __init__(self, max_age_minutes: int = FINGERPRINT_MAX_AGE_MINUTES,
+                 max_changed_fraction: float = INCREMENTAL_MAX_CHANGED_FRACTION):
+        self.max_age = timedelta(minutes=max_age_minutes)
+        self.max_changed_fraction = max_changed_fraction
+        self._entries = {}
+
+    def _affected_keys(self, entry: dict, odds_hashes: np.ndarray, key_hashes: np.ndarray) -> np.ndarray:
+        new_rows = ~np.isin(odds_hashes, entry['odds_hashes'])
+        old_rows = ~np.isin(entry['odds_hashes'], odds_hashes)
+        return np.unique(np.concatenate([key_hashes[new_rows], entry['key_hashes'][old_rows]]))
+
+    def _merge(self, game, previous: pd.DataFrame, affected: np.ndarray, repriced: pd.DataFrame) -> pd.DataFrame:
+        if len(previous):
+            previous = previous[~np.isin(_row_hashes(previous, PRICING_KEY_COLUMNS), affected)]
+        parts = [part for part in (previous, repriced) if len(part)]
+        if not parts:
+            return pd.DataFrame()
+        result = pd.concat(parts, ignore_index=True)
+        for column in CATEGORICAL_COLUMNS:
+            result[column] = pd.Categorical(result[column].astype(object), categories=game.odds_df[column].cat.categories)
+        return result.sort_values('ev_percent', ascending=False)
+
+    def price(self, games: list, betting_books: list[str], sharp_books: list[str], threshold: float = 0.0) -> tuple[dict, dict]:
+        """
+        Find EV bets for a slate of games, reusing unaffected results from the last call.
+
+        Args:
+            games: Game objects to price
+            betting_books: Bookmakers user is betting on
+            sharp_books: Bookmakers to use for sharp odds
+            threshold: Minimum EV percentage to include in results
+
+        Returns:
+            tuple: (results, changes). results maps game id -> full EV bets DataFrame, as
+                   find_plus_ev_slate would return it. changes maps game id -> diff_bets()
+                   change set against the previous result, or None if the game has no
+                   previous result to diff against.
+        """
+        settings = (tuple(betting_books), tuple(sharp_books), threshold)
+        now = datetime.now()
+        plans = []
+        for game in games:
+            odds_hashes = _row_hashes(game.odds_df, ODDS_KEY_COLUMNS)
+            key_hashes = _row_hashes(game.odds_df, PRICING_KEY_COLUMNS)
+            entry = self._entries.get(game.id)
+            affected = None
+            if (entry is not None and entry['settings'] == settings and entry['sport_data'] is game.sport_data
+                    and now - entry['priced_at'] < self.max_age):
+                affected = self._affected_keys(entry, odds_hashes, key_hashes)
+                if len(affected) > self.max_changed_fraction * max(len(np.unique(key_hashes)), 1):
+                    affected = None
+
+            view = game
+            if affected is not None and len(affected) == 0:
+                # Only timestamps moved; the previous result still stands
+                view = None
+            elif affected is not None:
+                view = copy.copy(game)
+                view.odds_df = game.odds_df[np.isin(key_hashes, affected)]
+            plans.append((game, view, entry, affected, odds_hashes, key_hashes))
+
+        priced = find_plus_ev_parallel([view for _, view, _, _, _, _ in plans if view is not None], betting_books, sharp_books, threshold)
+
+        results = {}
+        changes = {}
+        partial = 0
+        for game, view, entry, affected, odds_hashes, key_hashes in plans:
+            if view is None:
+                result = entry['result']
+                changes[game.id] = {'added': pd.DataFrame(), 'updated': pd.DataFrame(), 'removed': pd.DataFrame()}
+                priced_at = entry['priced_at']
+                partial += 1
+            elif affected is None:
+                result = priced[game.id]
+                changes[game.id] = diff_bets(entry['result'], result) if entry is not None else None
+                priced_at = now
+            else:
+                previous = entry['result']
+                result = self._merge(game, previous, affected, priced[game.id])
+                if len(previous):
+                    previous = previous[np.isin(_row_hashes(previous, PRICING_KEY_COLUMNS), affected)]
+                changes[game.id] = diff_bets(previous, priced[game.id])
+                priced_at = entry['priced_at']
+                partial += 1
+            results[game.id] = result
+            self._entries[game.id] = {
+                'odds_hashes': odds_hashes,
+                'key_hashes': key_hashes,
+                'result': result,
+                'sport_data': game.sport_data,
+                'settings': settings,
+                'priced_at': priced_at,
+            }
+
+        if partial:
+            logger.info(f"Repriced {partial} of {len(games)} games incrementally (changed player/markets only)")
+        return results, changes
+
+    def forget(self, game_id: str) -> None:
+        """Drop a game's state, e.g. when its stored bets may no longer match the last result."""
+        self._entries.pop(game_id, None)
+
+    def prune(self) -> None:
+        """Drop state too old to be reused."""
+        now = datetime.now()
+        for game_id in list(self._entries):
+            if now - self._entries[game_id]['priced_at'] >= self.max_age:
+                del self._entries[game_id]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+from collections import deque
+import pandas as pd
+
+# Number of recent priced games per sport a market is judged on
+MARKET_SELECTION_WINDOW = int(os.getenv('MARKET_SELECTION_WINDOW', '30'))
+# How often every market is requested again to discover newly offered ones
+MARKET_FULL_SWEEP_MINUTES = float(os.getenv('MARKET_FULL_SWEEP_MINUTES', '180'))
+
+
+class MarketSelector:
+    """
+    Learns which markets are worth requesting for each sport.
+
+    A market is only useful if a betting book (PrizePicks, Underdog, ...) offers a line
+    that matches a sharp line, since everything else is fetched and devigged for nothing.
+    After each game is priced the selector records, for every market requested, whether
+    it produced at least one matched betting line. A market that has gone a full window
+    of priced games without a match is left out of later requests. Every
+    MARKET_FULL_SWEEP_MINUTES a full sweep starts: each tracked event is fetched with
+    every market until it has been fetched once in full, so markets the DFS books start
+    offering are picked back up across the whole slate.
+    """
+
+    def __init__(self, window: int = MARKET_SELECTION_WINDOW, full_sweep_minutes: float = MARKET_FULL_SWEEP_MINUTES):
+        self.window = window
+        self.full_sweep_seconds = full_sweep_minutes * 60
+        self._lock = threading.Lock()
+        self._history = {}
+        self._last_sweep = {}
+        self._swept = {}
+        self._all_markets = {}
+
+    def _pruned(self, sport_key: str, all_markets: list[str]) -> list[str]:
+        # Caller holds the lock
+        history = self._history.get(sport_key, {})
+        return [
+            market for market in all_markets
+            if len(history.get(market, ())) < self.window or any(history[market])
+        ]
+
+    def pruned(self, sport_key: str, markets: str) -> str:
+        """Markets a sport's events are requested with outside a full sweep (e.g. to estimate cost)."""
+        all_markets = [m for m in markets.split(',') if m]
+        with self._lock:
+            selected = self._pruned(sport_key, all_markets)
+        return ','.join(selected) if selected else markets
+
+    def select(self, sport_key: str, markets: str, event_id: str = None) -> str:
+        """
+        Markets to request for a sport's event (or, without event_id, a whole cycle).
+
+        Args:
+            sport_key: Sport being fetched
+            markets: Comma-separated list of every market the sport supports
+            event_id: Event being fetched; during a full sweep it gets every market until
+                      record() sees it fetched in full
+
+        Returns:
+            str: Comma-separated markets to request (all of them on a full sweep)
+        """
+        all_markets = [m for m in markets.split(',') if m]
+        now = time.monotonic()
+        with self._lock:
+            self._all_markets[sport_key] = set(all_markets)
+            last_sweep = self._last_sweep.get(sport_key)
+            if last_sweep is None or now - last_sweep >= self.full_sweep_seconds:
+                self._last_sweep[sport_key] = now
+                self._swept[sport_key] = set()
+                if event_id is None:
+                    return markets
+            if event_id is not None and event_id not in self._swept[sport_key]:
+                return markets
+
+            selected = self._pruned(sport_key, all_markets)
+
+        # Never send an empty markets parameter
+        if not selected:
+            return markets
+        if len(selected) < len(all_markets):
+            print(f"Requesting {len(selected)} of {len(all_markets)} markets for {sport_key} "
+                  f"(skipping {', '.join(m for m in all_markets if m not in selected)})")
+        return ','.join(selected)
+
+    def swept(self, sport_key: str, event_id: str) -> bool:
+        """Whether an event has been fetched in full during the current sweep."""
+        with self._lock:
+            return event_id in self._swept.get(sport_key, ())
+
+    def record(self, sport_key: str, requested_markets: str, matched_markets, event_id: str = None) -> None:
+        """
+        Record which requested markets produced matched betting lines for one priced game.
+
+        Args:
+            sport_key: Sport of the game
+            requested_markets: Comma-separated markets that were requested for the game
+            matched_markets: Markets with a betting line matched by a sharp line (see matched_markets)
+            event_id: The game's event; marks it swept if every market was requested
+        """
+        matched = set(matched_markets)
+        with self._lock:
+            if event_id is not None and sport_key in self._swept and \
+                    set(requested_markets.split(',')) >= self._all_markets.get(sport_key, set()):
+                self._swept[sport_key].add(event_id)
+            history = self._history.setdefault(sport_key, {})
+            for market in requested_markets.split(','):
+                if market:
+                    history.setdefault(market, deque(maxlen=self.window)).append(market in matched)
+
+    def summary(self, sport_key: str) -> dict:
+        """Match rate over the window for each market seen for a sport."""
+        with self._lock:
+            return {
+                market: sum(results) / len(results)
+                for market, results in self._history.get(sport_key, {}).items()
+                if results
+            }
+
+
+def matched_markets(odds_df: pd.DataFrame, betting_books: list[str], sharp_books: list[str]) -> set:
+    """
+    Markets in which a betting book's line has sharp odds for the same player, i.e. the
+    markets that reach pricing, whether or not any of their bets turn out +EV.
+    """
+    if odds_df is None or len(odds_df) == 0:
+        return set()
+    keys = pd.MultiIndex.from_arrays([odds_df['player'].astype(object), odds_df['market'].astype(object)])
+    is_betting = odds_df['bookmaker'].isin(betting_books).to_numpy()
+    is_sharp = (odds_df['bookmaker'].isin(sharp_books) & (odds_df['outcome'] == 'Over')).to_numpy()
+    matched = keys[is_betting][keys[is_betting].isin(keys[is_sharp])]
+    return set(matched.get_level_values(1))
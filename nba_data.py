@@ -3,6 +3,7 @@ import numpy as np
 import json
 import os
 import matplotlib.pyplot as plt
+from slate_ev import find_plus_ev_slate, find_plus_ev_configs
 
 ODDS_API_TO_NBA_STATS_MAP = {
     'player_points': 'points',
@@ -60,16 +61,22 @@ class NBAData:
         self._std_cache[cache_key] = result
         return result
     
+    def get_std_cache(self) -> dict:
+        """(player, stat) -> (std_dev, sample_size) lookups cached so far, in the order they were made."""
+        return self._std_cache
+
     def get_mean(self, player: str, stat: str) -> tuple[float, int]:
         stat_values, sample_size = self.get_stats_for_all_games(player, stat)
         return (np.mean(stat_values) if sample_size > 0 else np.nan, sample_size)
     
     def find_ev_all_games(self, betting_books: list[str], sharp_books: list[str], threshold: float=0.03) -> pd.DataFrame:
-        ev = []
-        for game in self.games:
-            game_ev = game.find_plus_ev(betting_books, sharp_books, threshold)
-            ev.append(game_ev)
-        return pd.concat(ev).sort_values('ev_percent', ascending=False)
+        # Price every game in one slate-wide pass
+        ev = find_plus_ev_slate(self.games, betting_books, sharp_books, threshold)
+        return pd.concat(ev.values()).sort_values('ev_percent', ascending=False)
+
+    def find_ev_all_configs(self, configs: list[tuple]) -> list[pd.DataFrame]:
+        # One pass for several (betting_books, sharp_books, threshold) setups
+        return find_plus_ev_configs(self.games, configs)
     
     def plot_stats_distribution(self, player: str, stat: str, bins: int = 100) -> None:
         stat_values = self.get_stats_for_all_games(player, stat)
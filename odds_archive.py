@@ -0,0 +1,222 @@
+import glob
+import gzip
+import json
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ODDS_ARCHIVE_DIR = os.getenv('ODDS_ARCHIVE_DIR')
+ODDS_ARCHIVE_SEGMENT_MB = float(os.getenv('ODDS_ARCHIVE_SEGMENT_MB', '64'))
+
+# event_id used for events-list responses, which are not tied to a single event
+EVENTS_KEY = '__events__'
+
+
+def utc_timestamp(when: datetime = None) -> str:
+    """ISO 8601 UTC timestamp with millisecond precision, e.g. 2026-01-08T18:00:00.000Z"""
+    when = when or datetime.now(timezone.utc)
+    return when.astimezone(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == 'zst':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'zst':
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class ArchiveWriter:
+    """
+    Append-only archive of raw Odds API responses.
+
+    Each response is compressed on its own (zstd if the zstandard package is installed,
+    gzip otherwise) and appended to the current segment file. Every segment has a
+    sidecar .idx file with one JSON line per record giving its key and byte range, so
+    a reader can look any record up without scanning the segment.
+
+    Compression and disk writes happen on a background thread; record() only enqueues.
+    """
+
+    def __init__(self, root_dir: str, segment_mb: float = ODDS_ARCHIVE_SEGMENT_MB, codec: str = None):
+        self.root_dir = root_dir
+        self.segment_bytes = int(segment_mb * 1024 * 1024)
+        self.codec = codec or ('zst' if zstandard is not None else 'gz')
+        if self.codec == 'zst' and zstandard is None:
+            raise ImportError("zstd compression requires the 'zstandard' package")
+        os.makedirs(root_dir, exist_ok=True)
+
+        self._queue = queue.Queue()
+        self._segment = None
+        self._index = None
+        self._segment_path = None
+        self.records_written = 0
+        self.bytes_written = 0
+
+        self._thread = threading.Thread(target=self._run, name='odds-archive-writer', daemon=True)
+        self._thread.start()
+
+    def record(self, kind: str, sport: str, event_id: str, payload: bytes, fetch_time: str = None) -> None:
+        """
+        Queue a raw response body for archiving.
+
+        Args:
+            kind: 'events', 'odds', or 'odds_sharp' / 'odds_dfs' for the halves of a split refresh
+            sport: Sport key of the request
+            event_id: Event ID (None for events-list responses)
+            payload: Raw (decoded) response body
+            fetch_time: When the response was received (defaults to now)
+        """
+        self._queue.put((kind, sport, event_id or EVENTS_KEY, payload, fetch_time or utc_timestamp()))
+
+    def _open_segment(self) -> None:
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        self._segment_path = os.path.join(self.root_dir, f'segment-{stamp}.{self.codec}')
+        self._segment = open(self._segment_path, 'ab')
+        self._index = open(self._segment_path + '.idx', 'a', encoding='utf-8')
+
+    def _close_segment(self) -> None:
+        if self._segment is not None:
+            self._segment.close()
+            self._index.close()
+            self._segment = None
+            self._index = None
+
+    def _write(self, kind: str, sport: str, event_id: str, payload: bytes, fetch_time: str) -> None:
+        frame = _compress(payload, self.codec)
+
+        if self._segment is None or self._segment.tell() + len(frame) > self.segment_bytes:
+            self._close_segment()
+            self._open_segment()
+
+        offset = self._segment.tell()
+        self._segment.write(frame)
+        self._segment.flush()
+
+        # Only index the record once its bytes are on disk
+        self._index.write(json.dumps({
+            'kind': kind,
+            'sport': sport,
+            'event_id': event_id,
+            'fetch_time': fetch_time,
+            'offset': offset,
+            'length': len(frame)
+        }) + '\n')
+        self._index.flush()
+
+        self.records_written += 1
+        self.bytes_written += len(frame)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    self._close_segment()
+                    return
+                self._write(*item)
+            except Exception as e:
+                print(f"Error writing to odds archive: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued record has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write any queued records, close the current segment and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+class ArchiveReader:
+    """
+    Read access to an odds archive written by ArchiveWriter.
+
+    All segment indexes are loaded into a dict keyed by (kind, sport, event_id,
+    fetch_time), so get() is a single dict lookup plus one seek and decompress. The kind
+    is part of the key because a split refresh archives its sharp and DFS responses for
+    the same event at the same fetch time.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._index = {}
+        self.reload()
+
+    def reload(self) -> None:
+        """(Re)load every segment index under root_dir."""
+        self._index = {}
+        for index_path in sorted(glob.glob(os.path.join(self.root_dir, 'segment-*.idx'))):
+            segment_path = index_path[:-len('.idx')]
+            codec = segment_path.rsplit('.', 1)[-1]
+            with open(index_path, encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partially written last line from an interrupted writer
+                        continue
+                    entry['segment'] = segment_path
+                    entry['codec'] = codec
+                    self._index[(entry['kind'], entry['sport'], entry['event_id'], entry['fetch_time'])] = entry
+
+    def _read(self, entry: dict) -> dict:
+        with open(entry['segment'], 'rb') as f:
+            f.seek(entry['offset'])
+            frame = f.read(entry['length'])
+        return json.loads(_decompress(frame, entry['codec']))
+
+    def get(self, sport: str, event_id: str, fetch_time: str, kind: str = None) -> dict:
+        """
+        Look up one archived response.
+
+        Args:
+            sport: Sport key
+            event_id: Event ID (None for an events-list response)
+            fetch_time: Fetch timestamp as recorded
+            kind: Response kind as recorded (default: 'events' without an event_id, else 'odds')
+
+        Returns:
+            dict/list: The decoded JSON response, or None if it is not in the archive
+        """
+        if kind is None:
+            kind = 'odds' if event_id else 'events'
+        entry = self._index.get((kind, sport, event_id or EVENTS_KEY, fetch_time))
+        if entry is None:
+            return None
+        return self._read(entry)
+
+    def entries(self, sport: str = None, kind: str = None) -> list[dict]:
+        """
+        Index entries, optionally filtered by sport and kind, ordered by fetch time.
+
+        Returns:
+            list: Dicts with kind, sport, event_id, fetch_time, offset, length, segment and codec
+        """
+        return sorted(
+            (entry for entry in self._index.values()
+             if (sport is None or entry['sport'] == sport) and (kind is None or entry['kind'] == kind)),
+            key=lambda entry: entry['fetch_time']
+        )
+
+    def load(self, entry: dict) -> dict:
+        """Decode the response for an entry returned by entries()."""
+        return self._read(entry)
+
+    def __len__(self):
+        return len(self._index)
@@ -0,0 +1,79 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+# Force a full reprice this often even if odds are unchanged, so stat updates still flow through
+FINGERPRINT_MAX_AGE_MINUTES = int(os.getenv('FINGERPRINT_MAX_AGE_MINUTES', '60'))
+
+
+def odds_fingerprint(bookmakers: list[dict]) -> str:
+    """
+    Build a fingerprint of an event's odds payload.
+
+    The fingerprint covers every bookmaker/market last_update value and every outcome
+    (name, player, line, price), so it changes whenever any line or price moves.
+    It does not depend on the order bookmakers, markets or outcomes are returned in.
+
+    Args:
+        bookmakers (list): The 'bookmakers' list from an event odds response
+
+    Returns:
+        str: Hex digest identifying the odds snapshot
+    """
+    parts = []
+    for bookmaker in bookmakers:
+        for market in bookmaker['markets']:
+            outcomes = sorted(
+                (outcome.get('name'), outcome.get('description'), outcome.get('point'), outcome.get('price'))
+                for outcome in market['outcomes']
+            )
+            parts.append((bookmaker['key'], market['key'], market.get('last_update'), tuple(outcomes)))
+    parts.sort()
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+class FingerprintCache:
+    """
+    Remembers the odds fingerprint of each game as of the last time it was priced.
+
+    Kept for the lifetime of the scheduler process so unchanged games can skip
+    repricing and persistence on later cycles.
+    """
+
+    def __init__(self, max_age_minutes: int = FINGERPRINT_MAX_AGE_MINUTES):
+        self.max_age = timedelta(minutes=max_age_minutes)
+        self._entries = {}
+
+    def is_unchanged(self, game_id: str, fingerprint: str) -> bool:
+        """
+        Check whether a game's odds match the last priced snapshot.
+
+        Entries older than max_age are treated as changed so the game is repriced.
+        """
+        entry = self._entries.get(game_id)
+        if entry is None:
+            return False
+        return entry['fingerprint'] == fingerprint and datetime.now() - entry['priced_at'] < self.max_age
+
+    def update(self, game_id: str, fingerprint: str, bet_count: int) -> None:
+        """Record the fingerprint and number of bets stored for a freshly priced game."""
+        self._entries[game_id] = {
+            'fingerprint': fingerprint,
+            'bet_count': bet_count,
+            'priced_at': datetime.now()
+        }
+
+    def bet_count(self, game_id: str) -> int:
+        """Number of bets stored the last time the game was priced (0 if unknown)."""
+        entry = self._entries.get(game_id)
+        return entry['bet_count'] if entry else 0
+
+    def prune(self) -> None:
+        """Drop entries too old to be reused (e.g. games that have since started)."""
+        now = datetime.now()
+        for game_id in list(self._entries):
+            if now - self._entries[game_id]['priced_at'] >= self.max_age:
+                del self._entries[game_id]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,78 @@
+import threading
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ('bookmaker', 'market', 'player', 'outcome')
+
+
+class OddsDictionary:
+    """
+    One category dictionary per column shared by every odds frame of a slate.
+
+    Games are decoded with their own small dictionaries and remapped onto this one,
+    which only ever grows, so each frame's categories are a prefix of the slate's and
+    its codes are valid slate-wide codes. Frames decoded while the dictionary did not
+    grow share the same CategoricalDtype. Safe to use from the fetch threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = {column: {} for column in CATEGORICAL_COLUMNS}
+        self._values = {column: [] for column in CATEGORICAL_COLUMNS}
+        self._dtypes = {}
+
+    def __getstate__(self) -> dict:
+        # Games are pickled to pricing workers; the lock is per process, and the rest is
+        # copied under it so fetch threads cannot grow it mid-pickle
+        with self._lock:
+            return {
+                '_index': {column: dict(index) for column, index in self._index.items()},
+                '_values': {column: list(values) for column, values in self._values.items()},
+                '_dtypes': dict(self._dtypes),
+            }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _dtype(self, column: str) -> pd.CategoricalDtype:
+        # Caller holds the lock
+        dtype = self._dtypes.get(column)
+        if dtype is None or len(dtype.categories) != len(self._values[column]):
+            dtype = pd.CategoricalDtype(list(self._values[column]))
+            self._dtypes[column] = dtype
+        return dtype
+
+    def categorical(self, column: str, categories: list, codes: np.ndarray) -> pd.Categorical:
+        """Re-express a frame-local categorical (categories + codes) in the slate dictionary."""
+        with self._lock:
+            index = self._index[column]
+            values = self._values[column]
+            for value in categories:
+                if value not in index:
+                    index[value] = len(values)
+                    values.append(value)
+            remap = np.fromiter((index[value] for value in categories), dtype=np.int32, count=len(categories))
+            dtype = self._dtype(column)
+        return pd.Categorical.from_codes(remap[codes], dtype=dtype)
+
+    def dtype(self, column: str) -> pd.CategoricalDtype:
+        """Categorical dtype holding every value seen so far in the column."""
+        with self._lock:
+            return self._dtype(column)
+
+
+def widen(values) -> np.ndarray:
+    """
+    float32 odds values back to the float64 they were quoted as (1.82, not 1.8200000524).
+
+    Values are rounded to 6 significant digits, which is exact for prices and lines
+    (quoted with at most 6) and well above float32's rounding error.
+    """
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        return values
+    values = values.astype(np.float64)
+    magnitude = np.floor(np.log10(np.abs(values), out=np.zeros_like(values), where=values != 0))
+    scale = 10.0 ** (5 - magnitude)
+    return np.round(values * scale) / scale
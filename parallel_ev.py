@@ -0,0 +1,245 @@
+import os
+import copy
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pricing_log
+from slate_ev import find_plus_ev_slate
+
+# Worker processes used to price a slate; 0 or 1 prices in the calling process
+PRICING_WORKERS = int(os.getenv('PRICING_WORKERS', '0'))
+
+# Pool workers are never forked: the scheduler prices while the archive writer and fetch
+# threads run, and a forked child can inherit one of their locks held. Workers start from a
+# clean forkserver (or spawn, where forkserver is unavailable) process instead.
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# One pool is kept across calls. Its workers receive each sport's sport_data (stats and std
+# cache) once, when they start, and hold it read-only; tasks carry only games. The pool is
+# restarted when the worker count changes or a sport's sport_data is replaced (the scheduler
+# reloads stats on every events sync).
+_pool = None
+_pool_workers = 0
+_pool_sport_data = {}
+_pool_log_level = None
+_pool_lock = threading.Lock()
+
+# Inside a worker: sport_key -> sport_data, set by _init_worker
+_sport_data = None
+
+
+def set_default_workers(workers: int) -> None:
+    """Set the worker count used when none is passed explicitly (e.g. from a --workers flag)."""
+    global PRICING_WORKERS
+    if workers < 0:
+        raise ValueError(f"Worker count must be >= 0, got {workers}")
+    PRICING_WORKERS = workers
+
+
+def shutdown_pool() -> None:
+    """Stop the worker pool, if one is running; the next parallel call starts a new one."""
+    global _pool, _pool_sport_data
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+        _pool = None
+        _pool_sport_data = {}
+
+
+def _init_worker(sport_data: dict, log_level: int) -> None:
+    global _sport_data
+    _sport_data = sport_data
+    # Workers start from a fresh interpreter, so carry over a --pricing-log-level override
+    pricing_log.logger.setLevel(log_level)
+
+
+def _price_chunk(games: list, betting_books: list[str], sharp_books: list[str], threshold: float) -> tuple:
+    # Games arrive without their sport_data; attach this worker's copy
+    for game in games:
+        game.sport_data = _sport_data[game.sport_key]
+    sport_keys = sorted({game.sport_key for game in games})
+    # Std dev lookups made here stay in this worker, so send the new ones back with the results
+    cached = {sport_key: len(_sport_data[sport_key].get_std_cache()) for sport_key in sport_keys}
+    results = find_plus_ev_slate(games, betting_books, sharp_books, threshold)
+    lookups = {
+        sport_key: list(itertools.islice(_sport_data[sport_key].get_std_cache().items(), count, None))
+        for sport_key, count in cached.items()
+    }
+    return results, lookups
+
+
+def _chunks(order: list[int], workers: int) -> list[list[int]]:
+    # Deal games out round-robin in commence order, so every worker gets a similar share
+    # of the slate and each chunk is itself in commence order
+    return [order[start::workers] for start in range(min(workers, len(order)))]
+
+
+def _get_pool(workers: int, sport_data: dict) -> ProcessPoolExecutor:
+    # Caller holds _pool_lock
+    global _pool, _pool_workers, _pool_sport_data, _pool_log_level
+    current = all(_pool_sport_data.get(sport_key) is data for sport_key, data in sport_data.items())
+    if _pool is not None and (_pool_workers != workers or not current or _pool_log_level != pricing_log.logger.level):
+        _pool.shutdown()
+        _pool = None
+    if _pool is None:
+        # Keep the other sports' data so alternating sports do not restart the pool
+        _pool_sport_data = {**_pool_sport_data, **sport_data}
+        _pool_workers = workers
+        _pool_log_level = pricing_log.logger.level
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(START_METHOD),
+                                    initializer=_init_worker, initargs=(_pool_sport_data, _pool_log_level))
+    return _pool
+
+
+def find_plus_ev_parallel(games: list, betting_books: list[str], sharp_books: list[str], threshold: float = 0.0,
+                          workers: int = None) -> dict:
+    """
+    Find EV bets for a slate of games across a pool of worker processes.
+
+    Games are split into one chunk per worker and each chunk is priced with
+    find_plus_ev_slate in a long-lived worker process (see _get_pool) that already
+    holds each sport's stats; only the games, without their sport_data, are sent. The
+    std dev lookups the workers make are copied back into each sport_data's cache for
+    the next call. Falls back to a single in-process find_plus_ev_slate call with fewer
+    than two workers or games, or when games of one sport carry different sport_data.
+
+    Starting the pool ships the stats to every worker, and each call still pickles its
+    games, so on small slates or few cores the pool is slower than pricing in-process,
+    hence the PRICING_WORKERS default of 0.
+
+    Args:
+        games: Game objects to price (each with its own sport_data)
+        betting_books: Bookmakers user is betting on
+        sharp_books: Bookmakers to use for sharp odds
+        threshold: Minimum EV percentage to include in results
+        workers: Worker processes (default: PRICING_WORKERS)
+
+    Returns:
+        dict: Maps game id -> EV bets DataFrame as find_plus_ev_slate returns it, in
+              commence time order
+    """
+    global _pool
+    workers = PRICING_WORKERS if workers is None else workers
+    order = sorted(range(len(games)), key=lambda i: str(games[i].commence_time))
+    sport_data = {game.sport_key: game.sport_data for game in games}
+    if workers <= 1 or len(games) < 2 or any(sport_data[game.sport_key] is not game.sport_data for game in games):
+        results = find_plus_ev_slate(games, betting_books, sharp_books, threshold)
+        return {games[i].id: results[games[i].id] for i in order}
+
+    chunks = []
+    for indexes in _chunks(order, workers):
+        chunk = []
+        for i in indexes:
+            game = copy.copy(games[i])
+            game.sport_data = None
+            chunk.append(game)
+        chunks.append(chunk)
+
+    with _pool_lock:
+        executor = _get_pool(workers, sport_data)
+        try:
+            chunk_results = list(executor.map(
+                _price_chunk,
+                chunks,
+                [betting_books] * len(chunks),
+                [sharp_books] * len(chunks),
+                [threshold] * len(chunks),
+            ))
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool on the next call
+            _pool.shutdown(wait=False)
+            _pool = None
+            raise
+
+    priced = {}
+    for results, lookups in chunk_results:
+        priced.update(results)
+        for sport_key, entries in lookups.items():
+            sport_data[sport_key].get_std_cache().update(entries)
+    return {games[i].id: priced[games[i].id] for i in order}
+
+
+if __name__ == "__main__":
+    import io
+    import argparse
+    import tempfile
+    import time
+    import contextlib
+    import numpy as np
+    import pandas as pd
+    from fake_odds_api import FakeSlate, FakeOddsConfig
+    from get_data import NBA, NBA_MARKETS, game_from_odds_json
+    from odds_layout import OddsDictionary
+    from nba_data import NBAData, ODDS_API_TO_NBA_STATS_MAP
+
+    parser = argparse.ArgumentParser(description='Benchmark slate pricing across 1..N worker processes')
+    parser.add_argument('--games', type=int, default=15, help='Games in the synthetic NBA slate (default: 15)')
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help=f'Worker counts to time (default: 1 up to the {os.cpu_count()} available cores)')
+    parser.add_argument('--stat-rows', type=int, default=300000,
+                        help='Rows of game logs in the synthetic stats table (default: 300000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (default: 5)')
+    args = parser.parse_args()
+    worker_counts = args.workers or list(range(1, (os.cpu_count() or 1) + 1))
+
+    # A full NBA slate with a season-sized stats table covering its players
+    slate = FakeSlate(FakeOddsConfig(sport=NBA, games=args.games))
+    players = sorted({
+        outcome['description']
+        for event in slate.events
+        for bookmaker in slate.odds[event['id']]['bookmakers']
+        for market in bookmaker['markets']
+        for outcome in market['outcomes']
+    })
+    rng = np.random.default_rng(0)
+    names = np.array(players + [f'Bench Player {n}' for n in range(args.stat_rows // 60)], dtype=object)[
+        np.arange(args.stat_rows) % (len(players) + args.stat_rows // 60)]
+    stats = pd.DataFrame({
+        'firstName': [name.split(' ', 1)[0] for name in names],
+        'lastName': [name.split(' ', 1)[1] for name in names],
+        **{stat: rng.gamma(2.0, 3.0, args.stat_rows).round() for stat in ODDS_API_TO_NBA_STATS_MAP.values()},
+    })
+    with tempfile.NamedTemporaryFile(suffix='.csv') as stats_file:
+        stats.to_csv(stats_file.name, index=False)
+        sport_data = NBAData(stats_file.name)
+
+    def build_games():
+        # As get_games builds them: one shared OddsDictionary per slate
+        odds_dictionary = OddsDictionary()
+        return [
+            game_from_odds_json(slate.odds[event['id']], NBA_MARKETS, ','.join(betting_books + sharp_books), sport_data,
+                                odds_dictionary)
+            for event in slate.events
+        ]
+
+    betting_books = ['underdog', 'prizepicks', 'betr_us_dfs', 'pick6']
+    sharp_books = ['fanduel', 'draftkings']
+    print(f"{args.games}-game NBA slate, {args.stat_rows} stat rows, {os.cpu_count()} cores, {START_METHOD} workers")
+    # Keep the workers' per-game summaries out of the timings
+    pricing_log.set_level('WARNING')
+
+    baseline = None
+    for workers in worker_counts:
+        # The first call starts the pool (shipping the stats to each worker) and warms the
+        # std caches; it is timed separately, then repeated calls are timed against the
+        # warm pool, as the scheduler's refreshes run
+        games = build_games()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            find_plus_ev_parallel(games, betting_books, sharp_books, -5, workers=workers)
+        first = time.perf_counter() - start
+        times = []
+        for _ in range(args.repeat):
+            games = build_games()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = find_plus_ev_parallel(games, betting_books, sharp_books, -5, workers=workers)
+            times.append(time.perf_counter() - start)
+        elapsed = min(times)
+        baseline = baseline or elapsed
+        bets = sum(len(df) for df in results.values())
+        print(f"  {workers:>2} workers {elapsed * 1000:8.1f} ms  ({baseline / elapsed:.2f}x)  {bets} bets, "
+              f"first call {first * 1000:.1f} ms")
+    shutdown_pool()
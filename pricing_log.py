@@ -0,0 +1,69 @@
+import os
+import sys
+import logging
+
+# Pricing diagnostics level: DEBUG also lists the affected players, INFO logs one summary
+# per game, WARNING and above keeps pricing quiet
+PRICING_LOG_LEVEL = os.getenv('PRICING_LOG_LEVEL', 'INFO').upper()
+PRICING_LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR']
+
+# Per-game counters, in summary order
+COUNTERS = ('betting_lines', 'sharp_lines', 'matched', 'ev_bets', 'fallback_std', 'half_prob', 'unmatched', 'low_sample')
+
+logger = logging.getLogger('evbet.pricing')
+if not logger.handlers:
+    # Same stdout stream and "LEVEL: message" shape as the rest of the scheduler's output
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+
+def set_level(level: str) -> None:
+    """Set the pricing diagnostics level (e.g. from a --pricing-log-level flag)."""
+    level = level.upper()
+    if level not in PRICING_LOG_LEVELS:
+        raise ValueError(f"Unknown log level '{level}', expected one of {', '.join(PRICING_LOG_LEVELS)}")
+    logger.setLevel(level)
+
+
+def debug_enabled() -> bool:
+    """Whether detailed lists are wanted; build them only when this is True."""
+    return logger.isEnabledFor(logging.DEBUG)
+
+
+def new_counters() -> dict:
+    return dict.fromkeys(COUNTERS, 0)
+
+
+def log_affected(message: str, players, markets, sample_sizes=None, limit: int = 10) -> None:
+    """Debug-log a message followed by up to limit distinct player (market) pairs."""
+    columns = (players, markets) if sample_sizes is None else (players, markets, sample_sizes)
+    rows = list(dict.fromkeys(zip(*columns)))
+    lines = [f"  - {row[0]} ({row[1]})" + (f" n={row[2]}" if len(row) > 2 else '') for row in rows[:limit]]
+    if len(rows) > limit:
+        lines.append(f"  ... and {len(rows) - limit} more")
+    logger.debug('\n'.join([message] + lines))
+
+
+def log_game_summary(game, counters: dict, threshold: float, note: str = None) -> None:
+    """
+    Log one summary record for a priced game.
+
+    The counters are also attached to the record as record.pricing (with the game id and
+    threshold) for handlers that emit structured output.
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    message = (
+        f"{game.away_team} @ {game.home_team}: {counters['betting_lines']} betting / {counters['sharp_lines']} sharp lines, "
+        f"{counters['matched']} matched, {counters['ev_bets']} EV bets (>= {threshold}%) | "
+        f"fallback std {counters['fallback_std']}, 50% lines {counters['half_prob']}, "
+        f"unmatched {counters['unmatched']}, low sample {counters['low_sample']}"
+    )
+    if note:
+        message += f" | {note}"
+    logger.info(message, extra={'pricing': {'game_id': game.id, 'threshold': threshold, 'note': note, **counters}})
+
+
+set_level(PRICING_LOG_LEVEL)
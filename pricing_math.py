@@ -0,0 +1,170 @@
+import os
+import numpy as np
+from scipy.special import ndtr, ndtri
+
+# Serve norm_cdf/norm_ppf from precomputed interpolation tables instead of ndtr/ndtri
+PRICING_LOOKUP_TABLE = os.getenv('PRICING_LOOKUP_TABLE', '0') == '1'
+# Grid spacing of the CDF table (in standard deviations) and of the PPF table (in probability)
+PRICING_CDF_STEP = float(os.getenv('PRICING_CDF_STEP', '0.0005'))
+PRICING_PPF_STEP = float(os.getenv('PRICING_PPF_STEP', '0.00001'))
+
+# Beyond these the tables defer to ndtr/ndtri
+_CDF_Z_MAX = 8.5
+_PPF_P_MIN = 0.001
+
+
+class NormalTable:
+    """
+    Standard normal CDF and PPF as linear interpolation over uniform grids.
+
+    Lookups are an index computation plus one lerp, with no binary search. The CDF
+    table covers |z| <= 8.5 (beyond that Φ is 0 or 1 in float64); the PPF table covers
+    p in [0.001, 0.999] and defers to ndtri in the tails, where the inverse is too steep
+    to interpolate. The worst interpolation error of each table is measured against
+    ndtr/ndtri when it is built (cdf_max_error, ppf_max_error).
+    """
+
+    def __init__(self, cdf_step: float = PRICING_CDF_STEP, ppf_step: float = PRICING_PPF_STEP):
+        self.cdf_step = cdf_step
+        self.ppf_step = ppf_step
+
+        cdf_points = int(round(2 * _CDF_Z_MAX / cdf_step)) + 1
+        self._cdf_z = np.linspace(-_CDF_Z_MAX, _CDF_Z_MAX, cdf_points)
+        self._cdf = ndtr(self._cdf_z)
+
+        ppf_points = int(round((1 - 2 * _PPF_P_MIN) / ppf_step)) + 1
+        self._ppf_p = np.linspace(_PPF_P_MIN, 1 - _PPF_P_MIN, ppf_points)
+        self._ppf = ndtri(self._ppf_p)
+        self._cdf_dz = self._cdf_z[1] - self._cdf_z[0]
+        self._ppf_dp = self._ppf_p[1] - self._ppf_p[0]
+
+        # Interpolation error peaks between grid points; check every midpoint
+        cdf_mid = (self._cdf_z[1:] + self._cdf_z[:-1]) / 2
+        ppf_mid = (self._ppf_p[1:] + self._ppf_p[:-1]) / 2
+        self.cdf_max_error = float(np.abs(self.cdf(cdf_mid) - ndtr(cdf_mid)).max())
+        self.ppf_max_error = float(np.abs(self.ppf(ppf_mid) - ndtri(ppf_mid)).max())
+
+    @staticmethod
+    def _lerp(x, start: float, step: float, values: np.ndarray) -> np.ndarray:
+        position = (x - start) / step
+        index = np.clip(np.floor(np.nan_to_num(position)), 0, len(values) - 2).astype(np.intp)
+        fraction = position - index
+        return values[index] + fraction * (values[index + 1] - values[index])
+
+    def cdf(self, z) -> np.ndarray:
+        z = np.clip(np.asarray(z, dtype=np.float64), -_CDF_Z_MAX, _CDF_Z_MAX)
+        return self._lerp(z, -_CDF_Z_MAX, self._cdf_dz, self._cdf)
+
+    def ppf(self, p) -> np.ndarray:
+        p = np.asarray(p, dtype=np.float64)
+        result = self._lerp(p, _PPF_P_MIN, self._ppf_dp, self._ppf)
+        tails = (p < _PPF_P_MIN) | (p > 1 - _PPF_P_MIN) | np.isnan(p)
+        if tails.any():
+            result[tails] = ndtri(p[tails])
+        return result
+
+
+_table = None
+
+
+def use_lookup_table(enabled: bool = True, cdf_step: float = PRICING_CDF_STEP, ppf_step: float = PRICING_PPF_STEP) -> NormalTable | None:
+    """
+    Switch norm_cdf/norm_ppf between the interpolation tables and ndtr/ndtri.
+
+    Returns:
+        NormalTable: The table now in use (None when disabled)
+    """
+    global _table
+    if not enabled:
+        _table = None
+    elif _table is None or _table.cdf_step != cdf_step or _table.ppf_step != ppf_step:
+        _table = NormalTable(cdf_step, ppf_step)
+    return _table
+
+
+def norm_cdf(z) -> np.ndarray:
+    """Standard normal CDF Φ(z)."""
+    return ndtr(z) if _table is None else _table.cdf(z)
+
+
+def norm_ppf(p) -> np.ndarray:
+    """Standard normal quantile Φ^(-1)(p)."""
+    return ndtri(p) if _table is None else _table.ppf(p)
+
+
+def implied_mean(line, std_dev, over_prob) -> np.ndarray:
+    """
+    Mean of the Normal(μ, σ) stat distribution that prices the Over at over_prob.
+
+    μ = L - σ * Φ^(-1)(1 - p_over)
+    """
+    return line - std_dev * norm_ppf(1 - over_prob)
+
+
+def over_probability(line, mean, std_dev) -> np.ndarray:
+    """P(stat > line) for a Normal(mean, std_dev) stat."""
+    return 1 - norm_cdf((line - mean) / std_dev)
+
+
+def under_probability(line, mean, std_dev) -> np.ndarray:
+    """P(stat < line) for a Normal(mean, std_dev) stat."""
+    return norm_cdf((line - mean) / std_dev)
+
+
+if PRICING_LOOKUP_TABLE:
+    use_lookup_table()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from scipy import stats
+
+    parser = argparse.ArgumentParser(description='Benchmark pricing_math against scipy.stats.norm')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 5000, 100000],
+                        help='Array sizes to time, e.g. one game and one slate of lines (default: 200 5000 100000)')
+    parser.add_argument('--repeat', type=int, default=200, help='Timing repetitions (default: 200)')
+    args = parser.parse_args()
+
+    def best(fn):
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    start = time.perf_counter()
+    table = use_lookup_table()
+    build = time.perf_counter() - start
+    use_lookup_table(False)
+    print(f"Lookup table: built in {build * 1000:.1f} ms, max error cdf {table.cdf_max_error:.1e}, ppf {table.ppf_max_error:.1e}")
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        line = rng.normal(50, 20, size)
+        mean = rng.normal(50, 20, size)
+        std_dev = rng.uniform(1, 30, size)
+        prob = rng.uniform(0.02, 0.98, size)
+        print(f"{size} lines:")
+        timings = {
+            'scipy.stats.norm': (
+                best(lambda: stats.norm.cdf(line, loc=mean, scale=std_dev)),
+                best(lambda: line - std_dev * stats.norm.ppf(1 - prob)),
+            ),
+            'ndtr/ndtri': (
+                best(lambda: under_probability(line, mean, std_dev)),
+                best(lambda: implied_mean(line, std_dev, prob)),
+            ),
+        }
+        use_lookup_table()
+        timings['lookup table'] = (
+            best(lambda: under_probability(line, mean, std_dev)),
+            best(lambda: implied_mean(line, std_dev, prob)),
+        )
+        use_lookup_table(False)
+
+        base_cdf, base_ppf = timings['scipy.stats.norm']
+        for name, (cdf_time, ppf_time) in timings.items():
+            print(f"  {name:<18} cdf {cdf_time * 1e6:9.1f} us ({base_cdf / cdf_time:5.1f}x)"
+                  f"   ppf {ppf_time * 1e6:9.1f} us ({base_ppf / ppf_time:5.1f}x)")
@@ -0,0 +1,223 @@
+import math
+import os
+import threading
+from datetime import datetime, timezone
+
+QUOTA_RESET_DAY = int(os.getenv('QUOTA_RESET_DAY', '1'))
+QUOTA_MIN_INTERVAL_MINUTES = float(os.getenv('QUOTA_MIN_INTERVAL_MINUTES', '5'))
+QUOTA_MAX_INTERVAL_MINUTES = float(os.getenv('QUOTA_MAX_INTERVAL_MINUTES', '120'))
+QUOTA_RESERVE_FRACTION = float(os.getenv('QUOTA_RESERVE_FRACTION', '0.05'))
+
+
+class QuotaBudget:
+    """
+    Plans Odds API usage so the monthly request quota lasts until it resets.
+
+    The Odds API reports the remaining and used quota in the x-requests-remaining /
+    x-requests-used headers of every response. The budget records those, predicts the
+    cost of refreshing an event (markets x regions), stretches refresh intervals to
+    spread the remaining quota evenly until the reset date, and drops the lowest-value
+    games first when even the longest interval cannot cover every game.
+    """
+
+    def __init__(self, reset_day: int = QUOTA_RESET_DAY,
+                 min_interval_minutes: float = QUOTA_MIN_INTERVAL_MINUTES,
+                 max_interval_minutes: float = QUOTA_MAX_INTERVAL_MINUTES,
+                 reserve_fraction: float = QUOTA_RESERVE_FRACTION):
+        self.reset_day = reset_day
+        self.min_interval_minutes = min_interval_minutes
+        self.max_interval_minutes = max_interval_minutes
+        self.reserve_fraction = reserve_fraction
+
+        self._lock = threading.Lock()
+        self.remaining = None
+        self.used = None
+        self.last_cost = None
+        self.updated_at = None
+
+        self.cycle_cost = 0
+        self._game_values = {}
+
+    def record(self, headers) -> None:
+        """
+        Record the quota headers from an Odds API response.
+
+        Args:
+            headers: Response headers (missing quota headers are ignored)
+        """
+        remaining = headers.get('x-requests-remaining')
+        if remaining is None:
+            return
+
+        with self._lock:
+            self.remaining = float(remaining)
+            if headers.get('x-requests-used') is not None:
+                self.used = float(headers['x-requests-used'])
+            if headers.get('x-requests-last') is not None:
+                self.last_cost = float(headers['x-requests-last'])
+            self.updated_at = datetime.now(timezone.utc)
+
+    def next_reset(self, now: datetime = None) -> datetime:
+        """Next time the monthly quota resets (midnight UTC on reset_day)."""
+        now = now or datetime.now(timezone.utc)
+        reset = now.replace(day=min(self.reset_day, 28), hour=0, minute=0, second=0, microsecond=0)
+        if reset <= now:
+            if reset.month == 12:
+                reset = reset.replace(year=reset.year + 1, month=1)
+            else:
+                reset = reset.replace(month=reset.month + 1)
+        return reset
+
+    def minutes_until_reset(self, now: datetime = None) -> float:
+        now = now or datetime.now(timezone.utc)
+        return max((self.next_reset(now) - now).total_seconds() / 60, 1.0)
+
+    @staticmethod
+    def cost_per_event(markets: str, regions: str, bookmakers: str = None) -> int:
+        """
+        Predicted quota cost of one event odds request.
+
+        The Odds API charges markets x regions per request. When bookmakers are given
+        they take priority over regions, and every 10 bookmakers count as one region.
+        """
+        market_count = len([m for m in markets.split(',') if m])
+        if bookmakers:
+            region_count = math.ceil(len([b for b in bookmakers.split(',') if b]) / 10)
+        else:
+            region_count = len([r for r in regions.split(',') if r])
+        return market_count * max(region_count, 1)
+
+    @classmethod
+    def cost_per_refresh(cls, markets: str, sharp_bookmakers: str, dfs_bookmakers: str,
+                         dfs_refresh_every: float = 1) -> float:
+        """
+        Predicted quota cost of one split event refresh.
+
+        The sharp and DFS books are separate requests, each billed on its own. The DFS
+        request is only sent when the event's snapshot is stale, once every
+        dfs_refresh_every refreshes on average.
+        """
+        return (cls.cost_per_event(markets, '', sharp_bookmakers)
+                + cls.cost_per_event(markets, '', dfs_bookmakers) / max(dfs_refresh_every, 1))
+
+    def _usable_remaining(self) -> float:
+        return self.remaining * (1 - self.reserve_fraction)
+
+    def start_cycle(self) -> None:
+        """Reset the running cost estimate at the start of a scheduler cycle."""
+        self.cycle_cost = 0
+
+    def record_game_value(self, event_id: str, value: float) -> None:
+        """Record how valuable a game was on its last pricing (e.g. number of +EV bets)."""
+        self._game_values[event_id] = value
+
+    def _ranked(self, events: list[dict]) -> list[dict]:
+        # Most valuable first; never-priced games rank above all others, ties go to the
+        # game starting soonest
+        return sorted(events, key=lambda e: (-self._game_values.get(e['id'], math.inf), e['commence_time']))
+
+    def select_events(self, events: list[dict], markets: str, regions: str, bookmakers: str = None,
+                      per_event: float = None) -> list[dict]:
+        """
+        Choose which events to fetch this cycle.
+
+        If the remaining quota cannot cover every event even at the longest polling
+        interval, the lowest-value games are dropped first. Games that have never been
+        priced rank above all others, and ties go to the game starting soonest.
+
+        Args:
+            events: Upcoming events (dicts with 'id' and 'commence_time')
+            markets: Comma-separated markets requested per event
+            regions: Comma-separated regions requested per event
+            bookmakers: Comma-separated bookmakers requested per event
+            per_event: Quota cost of one event, if it is not a single request for
+                       markets/regions/bookmakers (e.g. from cost_per_refresh)
+
+        Returns:
+            list: Events to fetch, in their original order
+        """
+        if per_event is None:
+            per_event = self.cost_per_event(markets, regions, bookmakers)
+        if self.remaining is None or not events:
+            self.cycle_cost += per_event * len(events)
+            return events
+
+        # Quota this cycle may spend if cycles are spaced at the maximum interval
+        allowance = self._usable_remaining() * self.max_interval_minutes / self.minutes_until_reset()
+        allowance -= self.cycle_cost
+        affordable = max(int(allowance // per_event), 0)
+
+        if affordable >= len(events):
+            self.cycle_cost += per_event * len(events)
+            return events
+
+        keep_ids = {e['id'] for e in self._ranked(events)[:affordable]}
+        kept = [e for e in events if e['id'] in keep_ids]
+        self.cycle_cost += per_event * len(kept)
+
+        print(f"Quota budget: {self.remaining:.0f} requests left until {self.next_reset():%Y-%m-%d}, "
+              f"dropping {len(events) - len(kept)} of {len(events)} lowest-value games this cycle")
+        return kept
+
+    def stretch_factor(self, spend_per_minute: float) -> float:
+        """
+        Factor to stretch per-event refresh intervals by so the quota lasts until reset.
+
+        Args:
+            spend_per_minute: Quota the refresh cadence would spend per minute
+
+        Returns:
+            float: 1.0 when the quota covers the cadence, larger when refreshes must slow
+                   down (capped at max_interval_minutes / min_interval_minutes)
+        """
+        max_stretch = self.max_interval_minutes / self.min_interval_minutes
+        if self.remaining is None or spend_per_minute <= 0:
+            return 1.0
+
+        usable = self._usable_remaining()
+        if usable <= 0:
+            return max_stretch
+
+        sustainable_per_minute = usable / self.minutes_until_reset()
+        return min(max(spend_per_minute / sustainable_per_minute, 1.0), max_stretch)
+
+    def select_refresh_events(self, due: list[dict], tracked: list[tuple[dict, float]]) -> list[dict]:
+        """
+        Choose which due events the refresh loop fetches.
+
+        If the tracked games would spend more than the quota sustains even with every
+        refresh interval stretched to the cap (see stretch_factor), only the most
+        valuable games that fit are kept refreshing, ranked as in select_events; due
+        games outside that set are skipped this time.
+
+        Args:
+            due: Events due for a refresh now
+            tracked: (event, spend per minute at the unstretched cadence) for every
+                     tracked event, as RefreshQueue.spend_by_event returns
+
+        Returns:
+            list: Due events to fetch, in their original order
+        """
+        if self.remaining is None or not due:
+            return due
+
+        max_stretch = self.max_interval_minutes / self.min_interval_minutes
+        sustainable = self._usable_remaining() / self.minutes_until_reset() * max_stretch
+        if sum(spend for _, spend in tracked) <= sustainable:
+            return due
+
+        spend_by_id = {event['id']: spend for event, spend in tracked}
+        keep_ids = set()
+        total = 0.0
+        for event in self._ranked([event for event, _ in tracked]):
+            total += spend_by_id[event['id']]
+            if total > sustainable:
+                break
+            keep_ids.add(event['id'])
+
+        kept = [event for event in due if event['id'] in keep_ids]
+        if len(kept) < len(due):
+            print(f"Quota budget: {self.remaining:.0f} requests left until {self.next_reset():%Y-%m-%d}, "
+                  f"refreshing only the {len(keep_ids)} most valuable of {len(tracked)} games "
+                  f"(skipping {len(due) - len(kept)} of {len(due)} due)")
+        return kept
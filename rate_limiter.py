@@ -0,0 +1,100 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+ODDS_API_RATE_PER_SECOND = float(os.getenv('ODDS_API_RATE_PER_SECOND', '10'))
+ODDS_API_BURST = float(os.getenv('ODDS_API_BURST', '10'))
+ODDS_API_MIN_RATE_PER_SECOND = float(os.getenv('ODDS_API_MIN_RATE_PER_SECOND', '0.5'))
+ODDS_API_MAX_RETRIES = int(os.getenv('ODDS_API_MAX_RETRIES', '4'))
+ODDS_API_BACKOFF_BASE_SECONDS = float(os.getenv('ODDS_API_BACKOFF_BASE_SECONDS', '0.5'))
+ODDS_API_BACKOFF_MAX_SECONDS = float(os.getenv('ODDS_API_BACKOFF_MAX_SECONDS', '30'))
+
+# Statuses worth retrying: rate limited or a transient server error
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every request a client sends.
+
+    Tokens refill at `rate` per second up to `capacity`; each request takes one. The rate
+    adapts to the provider: it is halved whenever a 429 comes back and creeps back up
+    towards max_rate on successes, so sustained throughput settles just under the
+    provider's limit. A Retry-After pause stops all callers until it has passed.
+    """
+
+    def __init__(self, rate: float = ODDS_API_RATE_PER_SECOND, capacity: float = ODDS_API_BURST,
+                 min_rate: float = ODDS_API_MIN_RATE_PER_SECOND):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled_count = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        """Block until a token is available (and any Retry-After pause is over), then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds` (e.g. from a Retry-After header)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+    def on_throttled(self) -> None:
+        """Multiplicative decrease after a 429."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.throttled_count += 1
+
+    def on_success(self) -> None:
+        """Additive increase after a successful request."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.02)
+
+
+def retry_after_seconds(value: str) -> float:
+    """
+    Parse a Retry-After header (delta seconds or an HTTP date).
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_seconds(attempt: int, base: float = ODDS_API_BACKOFF_BASE_SECONDS,
+                    cap: float = ODDS_API_BACKOFF_MAX_SECONDS) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,191 @@
+import heapq
+import itertools
+import os
+from datetime import datetime, timedelta, timezone
+
+# Refresh cadence by time to kickoff: "<minutes to start>:<refresh every N minutes>,..."
+REFRESH_TIERS = os.getenv('REFRESH_TIERS', '60:3,360:10,1440:30')
+REFRESH_MAX_INTERVAL_MINUTES = float(os.getenv('REFRESH_MAX_INTERVAL_MINUTES', '60'))
+# How soon an event whose odds fetch failed is tried again
+REFRESH_RETRY_MINUTES = float(os.getenv('REFRESH_RETRY_MINUTES', '1'))
+
+
+def parse_tiers(spec: str) -> list[tuple[float, float]]:
+    """
+    Parse a refresh tier spec like '60:3,360:10,1440:30'.
+
+    Returns:
+        list: (minutes_to_start, refresh_interval_minutes) pairs sorted by minutes_to_start
+    """
+    tiers = []
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        horizon, interval = part.split(':')
+        tiers.append((float(horizon), float(interval)))
+    return sorted(tiers)
+
+
+def parse_commence_time(commence_time: str) -> datetime:
+    return datetime.fromisoformat(commence_time.replace('Z', '+00:00'))
+
+
+class RefreshQueue:
+    """
+    Priority queue of upcoming events keyed on when each is next due for an odds refresh.
+
+    How often an event is refreshed depends on how close it is to kickoff: games about
+    to start are refreshed every few minutes, games days away roughly hourly.
+    """
+
+    def __init__(self, tiers: list[tuple[float, float]] = None, max_interval_minutes: float = REFRESH_MAX_INTERVAL_MINUTES):
+        self.tiers = tiers if tiers is not None else parse_tiers(REFRESH_TIERS)
+        self.max_interval_minutes = max_interval_minutes
+
+        self._heap = []
+        self._counter = itertools.count()
+        self._events = {}
+        self._due = {}
+
+    def interval_minutes(self, event: dict, now: datetime) -> float:
+        """Refresh interval for an event given the time left until it starts."""
+        minutes_to_start = (parse_commence_time(event['commence_time']) - now).total_seconds() / 60
+        for horizon, interval in self.tiers:
+            if minutes_to_start <= horizon:
+                return interval
+        return self.max_interval_minutes
+
+    def _push(self, event_id: str, due: datetime) -> None:
+        self._due[event_id] = due
+        heapq.heappush(self._heap, (due, next(self._counter), event_id))
+
+    def sync(self, sport_key: str, events: list[dict], now: datetime = None) -> list[str]:
+        """
+        Bring the queue in line with the latest upcoming events for a sport.
+
+        New events are due immediately, known events keep their due time (with refreshed
+        metadata), and events no longer listed are removed.
+
+        Args:
+            sport_key: Sport the events belong to
+            events: Upcoming events from the events endpoint
+            now: Current time (UTC)
+
+        Returns:
+            list: IDs of events removed from the queue
+        """
+        now = now or datetime.now(timezone.utc)
+        listed = {event['id'] for event in events}
+
+        removed = [
+            event_id for event_id, (event_sport, _) in self._events.items()
+            if event_sport == sport_key and event_id not in listed
+        ]
+        for event_id in removed:
+            del self._events[event_id]
+            self._due.pop(event_id, None)
+
+        for event in events:
+            is_new = event['id'] not in self._events
+            self._events[event['id']] = (sport_key, event)
+            if is_new:
+                self._push(event['id'], now)
+
+        return removed
+
+    def pop_due(self, now: datetime = None) -> list[tuple[str, dict]]:
+        """
+        Remove and return every event that is due for a refresh.
+
+        Returns:
+            list: (sport_key, event) pairs ordered by commence time
+        """
+        now = now or datetime.now(timezone.utc)
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_time, _, event_id = heapq.heappop(self._heap)
+            # Skip stale heap entries for removed or rescheduled events
+            if self._due.get(event_id) != due_time:
+                continue
+            del self._due[event_id]
+            due.append(self._events[event_id])
+        return sorted(due, key=lambda item: item[1]['commence_time'])
+
+    def schedule_next(self, event_id: str, now: datetime = None, stretch: float = 1.0) -> datetime:
+        """
+        Schedule an event's next refresh based on its time to kickoff.
+
+        Args:
+            event_id: Event that was just refreshed
+            now: Current time (UTC)
+            stretch: Multiplier applied to the interval (e.g. to save quota)
+
+        Returns:
+            datetime: When the event is next due, or None if the event has started
+        """
+        now = now or datetime.now(timezone.utc)
+        if event_id not in self._events:
+            return None
+        _, event = self._events[event_id]
+        if parse_commence_time(event['commence_time']) <= now:
+            del self._events[event_id]
+            self._due.pop(event_id, None)
+            return None
+        due = now + timedelta(minutes=self.interval_minutes(event, now) * stretch)
+        self._push(event_id, due)
+        return due
+
+    def requeue(self, event_id: str, now: datetime = None, delay_minutes: float = REFRESH_RETRY_MINUTES) -> datetime:
+        """
+        Put an event whose refresh failed back on the queue after a short delay,
+        instead of waiting out its full refresh interval.
+
+        Returns:
+            datetime: When the event is next due, or None if the event has started
+        """
+        now = now or datetime.now(timezone.utc)
+        if event_id not in self._events:
+            return None
+        _, event = self._events[event_id]
+        if parse_commence_time(event['commence_time']) <= now:
+            del self._events[event_id]
+            self._due.pop(event_id, None)
+            return None
+        due = now + timedelta(minutes=min(delay_minutes, self.interval_minutes(event, now)))
+        self._push(event_id, due)
+        return due
+
+    def next_due(self) -> datetime:
+        """Earliest time any queued event is due, or None if the queue is empty."""
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def spend_by_event(self, cost_per_event: dict, now: datetime = None) -> list[tuple[dict, float]]:
+        """
+        Quota each queued event will spend per minute at its current refresh cadence.
+
+        Args:
+            cost_per_event: Mapping of sport_key -> quota cost of one event odds request
+
+        Returns:
+            list: (event, spend per minute) pairs for events that have not started
+        """
+        now = now or datetime.now(timezone.utc)
+        return [
+            (event, cost_per_event.get(sport_key, 0) / self.interval_minutes(event, now))
+            for sport_key, event in self._events.values()
+            if parse_commence_time(event['commence_time']) > now
+        ]
+
+    def spend_per_minute(self, cost_per_event: dict, now: datetime = None) -> float:
+        """
+        Quota the queue will spend per minute at its current refresh cadence.
+
+        Args:
+            cost_per_event: Mapping of sport_key -> quota cost of one event odds request
+        """
+        return sum(spend for _, spend in self.spend_by_event(cost_per_event, now))
+
+    def __len__(self):
+        return len(self._events)
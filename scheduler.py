@@ -1,129 +1,317 @@
-import schedule
 import time
 import os
 import sys
 import argparse
-from datetime import datetime, timedelta
+import devig
+import parallel_ev
+import pricing_log
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-from get_data import get_events, get_game, NFL, NBA, NFL_MARKETS, NBA_MARKETS
+from get_data import OddsApiClient, get_client, game_from_odds_json, NFL, NBA, NFL_MARKETS, NBA_MARKETS
 from nfl_data import NFLData
 from nba_data import NBAData
 from database import Database
+from odds_fingerprint import FingerprintCache, odds_fingerprint
+from quota_budget import QuotaBudget
+from refresh_queue import RefreshQueue
+from market_selector import MarketSelector, matched_markets
+from parallel_ev import find_plus_ev_parallel
+from incremental_ev import IncrementalPricer
+from odds_archive import ArchiveWriter, ArchiveReader, ODDS_ARCHIVE_DIR
 
 # Load environment variables
 load_dotenv()
 
-def update_bets_for_sport(db: Database, sport_key: str, sport_title: str, markets: str, 
-                          data_class, days_ahead: int = 7):
+ODDS_REGIONS = 'us,us_dfs'
+ODDS_BOOKMAKERS = 'prizepicks,underdog,betr_us_dfs,pick6,fanduel,draftkings'
+BETTING_BOOKS = ['underdog', 'prizepicks', 'betr_us_dfs', 'pick6']
+SHARP_BOOKS = ['fanduel', 'draftkings']
+# Sharp lines are fetched on every refresh, DFS lines reused from a snapshot cache
+# (see get_data.DFS_SNAPSHOT_TTL_SECONDS)
+ODDS_SHARP_BOOKMAKERS = ','.join(SHARP_BOOKS)
+ODDS_DFS_BOOKMAKERS = ','.join(BETTING_BOOKS)
+# In the refresh loop a game's DFS snapshot is reused for this many of its refreshes,
+# so the DFS cadence follows the game's refresh tier
+DFS_SNAPSHOT_REFRESHES = int(os.getenv('DFS_SNAPSHOT_REFRESHES', '3'))
+
+SPORT_CONFIGS = {
+    'nfl': {'sport_key': NFL, 'sport_title': 'NFL', 'markets': NFL_MARKETS, 'data_class': NFLData, 'days_ahead': 9},
+    'nba': {'sport_key': NBA, 'sport_title': 'NBA', 'markets': NBA_MARKETS, 'data_class': NBAData, 'days_ahead': 4},
+}
+
+def get_upcoming_events(db: Database, client: OddsApiClient, sport_key: str, sport_title: str, days_ahead: int = 7):
+    """
+    Fetch events for the next N days, skip ones that have started and store the rest as games
+    
+    Args:
+        db: Database instance
+        client: Odds API client
+        sport_key: Sport key (e.g., 'americanfootball_nfl', 'basketball_nba')
+        sport_title: Sport title (e.g., 'NFL', 'NBA')
+        days_ahead: Number of days ahead to fetch games for
+    
+    Returns:
+        list: Upcoming events, or None if the events request failed
+    """
+    # Get games for the next N days
+    commence_time_to = (datetime.now(timezone.utc) + timedelta(days=days_ahead)).isoformat(timespec='seconds').replace('+00:00', 'Z')
+    events = client.get_events(sport_key, commence_time_to)
+    
+    if events is None:
+        return None
+    
+    print(f"Found {len(events)} {sport_title} events")
+    
+    skipped_count = 0
+    upcoming = []
+    
+    for event in events:
+        try:
+            # Check if game has already started (skip if commenced)
+            commence_time = datetime.fromisoformat(event['commence_time'].replace('Z', '+00:00'))
+            now = datetime.now(commence_time.tzinfo)
+            
+            if commence_time <= now:
+                skipped_count += 1
+                continue
+            
+            # Insert game into database
+            game_data = {
+                'id': event['id'],
+                'sport_key': event['sport_key'],
+                'sport_title': event['sport_title'],
+                'commence_time': event['commence_time'],
+                'home_team': event['home_team'],
+                'away_team': event['away_team']
+            }
+            db.insert_game(game_data)
+            upcoming.append(event)
+            
+        except Exception as e:
+            print(f"Error processing event {event.get('id')}: {e}")
+            continue
+    
+    if skipped_count > 0:
+        print(f"Skipped {skipped_count} games that had already commenced")
+    
+    return upcoming
+
+def price_events(db: Database, client: OddsApiClient, fingerprints: FingerprintCache, sport_key: str,
+                 markets: str, sport_data, events: list[dict], refresh_per_game: bool = False,
+                 market_selector: MarketSelector = None, pricer: IncrementalPricer = None,
+                 dfs_max_age: dict = None) -> dict:
+    """
+    Fetch odds for a batch of events concurrently, price them as one slate and store their EV bets
+    
+    Args:
+        db: Database instance
+        client: Odds API client
+        fingerprints: Odds fingerprints of previously priced games
+        sport_key: Sport key of the events
+        markets: Comma-separated list of markets to fetch
+        sport_data: NFLData or NBAData instance used for std dev lookups
+        events: Events to refresh
+        refresh_per_game: If True, each repriced game's old bets are deactivated before its new
+                          bets are stored, and games whose odds are unchanged since they were
+                          last priced keep their active bets and are not repriced. If False, the
+                          caller has deactivated the whole sport and every game is priced.
+        market_selector: If given, records which of the requested markets produced matched
+                         betting lines for each priced game
+        pricer: If given, games are repriced incrementally (only player/markets whose odds
+                moved) and, with refresh_per_game, only the changed bets are written
+        dfs_max_age: Optional mapping of event_id -> max age in seconds of its cached DFS odds
+    
+    Returns:
+        dict: ev_bets, priced, unchanged and failed counts, and failed_ids
+    """
+    summary = {'ev_bets': 0, 'priced': 0, 'unchanged': 0, 'failed': 0, 'failed_ids': []}
+    if not events:
+        return summary
+    
+    # Fetch fresh sharp odds for every event concurrently, merged with cached DFS odds
+    fetch_start = time.perf_counter()
+    games = client.get_games(
+        sport_key,
+        [event['id'] for event in events],
+        ODDS_REGIONS,
+        markets,
+        'decimal',
+        ODDS_SHARP_BOOKMAKERS,
+        sport_data,
+        dfs_bookmakers=ODDS_DFS_BOOKMAKERS,
+        dfs_max_age=dfs_max_age
+    )
+    print(f"Fetched odds for {len(events)} events in {time.perf_counter() - fetch_start:.2f}s")
+    
+    # Settle failed and unchanged games, collect the rest for one slate-wide pricing pass
+    to_price = []
+    for event in events:
+        try:
+            print(f"\nProcessing: {event['away_team']} @ {event['home_team']} {event['commence_time']}")
+            
+            game = games.get(event['id'])
+            
+            if game is None:
+                print(f"Failed to get game data for {event['id']}")
+                summary['failed'] += 1
+                summary['failed_ids'].append(event['id'])
+                continue
+            
+            # Skip repricing if no line or price has moved since the last time it was priced;
+            # its bets are still active, since only repricing a game deactivates them
+            fingerprint = odds_fingerprint(game.bookmakers)
+            if refresh_per_game and fingerprints.is_unchanged(event['id'], fingerprint):
+                # An event not yet swept was fetched with every market, so record the sweep
+                # (and what it matched) even though nothing is repriced
+                if market_selector is not None and not market_selector.swept(sport_key, event['id']):
+                    market_selector.record(sport_key, markets,
+                                           matched_markets(game.odds_df, BETTING_BOOKS, SHARP_BOOKS), event['id'])
+                summary['unchanged'] += 1
+                summary['ev_bets'] += fingerprints.bet_count(event['id'])
+                print("Odds unchanged since last pricing, keeping existing EV bets")
+                continue
+            
+            to_price.append((event, game, fingerprint))
+            
+        except Exception as e:
+            print(f"Error processing event {event.get('id')}: {e}")
+            summary['failed'] += 1
+            summary['failed_ids'].append(event.get('id'))
+            continue
+    
+    if not to_price:
+        return summary
+    
+    # Find EV bets for every changed game at once (threshold of -5 to get all positive EV)
+    price_start = time.perf_counter()
+    slate_changes = {}
+    try:
+        if pricer is not None:
+            slate_bets, slate_changes = pricer.price([game for _, game, _ in to_price], BETTING_BOOKS, SHARP_BOOKS, -5)
+        else:
+            slate_bets = find_plus_ev_parallel([game for _, game, _ in to_price], BETTING_BOOKS, SHARP_BOOKS, -5)
+    except Exception as e:
+        print(f"Error pricing {len(to_price)} games as a slate, pricing them one at a time: {e}")
+        slate_bets = {}
+        if pricer is not None:
+            for _, game, _ in to_price:
+                pricer.forget(game.id)
+    print(f"Priced {len(to_price)} games in {time.perf_counter() - price_start:.2f}s")
+    
+    for event, game, fingerprint in to_price:
+        try:
+            ev_bets = slate_bets[game.id] if game.id in slate_bets else game.find_plus_ev(BETTING_BOOKS, SHARP_BOOKS, -5)
+            
+            # Replace this game's bets in the database, or apply just what changed
+            changes = slate_changes.get(game.id)
+            if refresh_per_game and changes is not None:
+                db.apply_ev_bet_changes(event['id'], changes)
+                print(f"Applied {len(changes['added'])} added, {len(changes['updated'])} updated and "
+                      f"{len(changes['removed'])} removed bets")
+            else:
+                if refresh_per_game:
+                    db.deactivate_bets_for_game(event['id'])
+                db.insert_ev_bets(ev_bets, event['id'])
+            
+            bet_count = len(ev_bets)
+            if market_selector is not None:
+                market_selector.record(sport_key, markets, matched_markets(game.odds_df, BETTING_BOOKS, SHARP_BOOKS),
+                                       event['id'])
+            fingerprints.update(event['id'], fingerprint, bet_count)
+            if client.budget is not None:
+                client.budget.record_game_value(event['id'], int((ev_bets['ev_percent'] > 0).sum()) if bet_count else 0)
+            summary['ev_bets'] += bet_count
+            summary['priced'] += 1
+            print(f"{event['away_team']} @ {event['home_team']}: found {bet_count} EV bets")
+            
+        except Exception as e:
+            print(f"Error processing event {event.get('id')}: {e}")
+            summary['failed'] += 1
+            summary['failed_ids'].append(event.get('id'))
+            if pricer is not None:
+                # The stored bets may no longer match the pricer's last result
+                pricer.forget(event['id'])
+            continue
+    
+    return summary
+
+def update_bets_for_sport(db: Database, client: OddsApiClient, fingerprints: FingerprintCache, sport_key: str,
+                          sport_title: str, markets: str, data_class, days_ahead: int = 7,
+                          market_selector: MarketSelector = None):
     """
     Fetch and update EV bets for a given sport
     
     Args:
         db: Database instance
+        client: Odds API client (reused across cycles)
+        fingerprints: Odds fingerprints of previously priced games (reused across cycles)
         sport_key: Sport key (e.g., 'americanfootball_nfl', 'basketball_nba')
         sport_title: Sport title (e.g., 'NFL', 'NBA')
         markets: Comma-separated list of markets to fetch
         data_class: Data class to use (NFLData or NBAData)
         days_ahead: Number of days ahead to fetch games for
+        market_selector: Learned market selection; every market is requested if None
     """
     print(f"\n{'='*50}")
     print(f"[{datetime.now()}] Updating {sport_title} bets...")
     print(f"{'='*50}\n")
     
     try:
-        # Get games for the next N days
-        commence_time_to = (datetime.now() + timedelta(days=days_ahead)).isoformat(timespec='seconds') + 'Z'
-        events = get_events(sport_key, commence_time_to)
+        upcoming = get_upcoming_events(db, client, sport_key, sport_title, days_ahead)
         
-        if not events:
+        if not upcoming:
             print(f"No {sport_title} events found")
             return
         
-        print(f"Found {len(events)} {sport_title} events")
         sport_data = data_class()
         
-        total_ev_bets = 0
-        skipped_count = 0
+        if market_selector is not None:
+            markets = market_selector.select(sport_key, markets)
         
-        for event in events:
-            try:
-                print(f"\nProcessing: {event['away_team']} @ {event['home_team']} {event['commence_time']}")
-                
-                # Check if game has already started (skip if commenced)
-                commence_time = datetime.fromisoformat(event['commence_time'].replace('Z', '+00:00'))
-                now = datetime.now(commence_time.tzinfo)
-                
-                if commence_time <= now:
-                    print(f"  Skipping: Game has already commenced at {commence_time}")
-                    skipped_count += 1
-                    continue
-                
-                # Insert game into database
-                game_data = {
-                    'id': event['id'],
-                    'sport_key': event['sport_key'],
-                    'sport_title': event['sport_title'],
-                    'commence_time': event['commence_time'],
-                    'home_team': event['home_team'],
-                    'away_team': event['away_team']
-                }
-                db.insert_game(game_data)
-                
-                # Get odds and calculate EV
-                game = get_game(
-                    sport_key,
-                    event['id'],
-                    'us,us_dfs',
-                    markets,
-                    'decimal',
-                    'prizepicks,underdog,betr_us_dfs,pick6,fanduel,draftkings',
-                    sport_data
-                )
-                
-                if game is None:
-                    print(f"Failed to get game data for {event['id']}")
-                    continue
-                
-                # Find EV bets (threshold of -5 to get all positive EV)
-                ev_bets = game.find_plus_ev(
-                    ['underdog', 'prizepicks', 'betr_us_dfs', 'pick6'], 
-                    ['fanduel', 'draftkings'], 
-                    -5
-                )
-                
-                # Insert EV bets into database
-                db.insert_ev_bets(ev_bets, event['id'])
-                
-                bet_count = len(ev_bets)
-                total_ev_bets += bet_count
-                print(f"Found {bet_count} EV bets")
-                
-            except Exception as e:
-                print(f"Error processing event {event.get('id')}: {e}")
-                continue
+        # Drop the lowest-value games if the remaining quota cannot cover them all
+        if client.budget is not None:
+            upcoming = client.budget.select_events(
+                upcoming, markets, ODDS_REGIONS,
+                per_event=client.budget.cost_per_refresh(markets, ODDS_SHARP_BOOKMAKERS, ODDS_DFS_BOOKMAKERS)
+            )
+        
+        summary = price_events(db, client, fingerprints, sport_key, markets, sport_data, upcoming,
+                               market_selector=market_selector)
         
-        print(f"\n{sport_title} Update Complete: {total_ev_bets} total EV bets found")
-        if skipped_count > 0:
-            print(f"Skipped {skipped_count} games that had already commenced")
+        print(f"\n{sport_title} Update Complete: {summary['ev_bets']} total EV bets found")
+        if summary['unchanged'] > 0:
+            print(f"Skipped repricing {summary['unchanged']} games with unchanged odds")
         
     except Exception as e:
         print(f"Error in update_{sport_title.lower()}_bets: {e}")
 
-def update_nfl_bets(db: Database):
+def update_nfl_bets(db: Database, client: OddsApiClient, fingerprints: FingerprintCache, market_selector: MarketSelector = None):
     """Fetch and update NFL EV bets"""
-    update_bets_for_sport(db, NFL, 'NFL', NFL_MARKETS, NFLData, days_ahead=9)
+    update_bets_for_sport(db, client, fingerprints, **SPORT_CONFIGS['nfl'], market_selector=market_selector)
 
-def update_nba_bets(db: Database):
+def update_nba_bets(db: Database, client: OddsApiClient, fingerprints: FingerprintCache, market_selector: MarketSelector = None):
     """Fetch and update NBA EV bets"""
-    update_bets_for_sport(db, NBA, 'NBA', NBA_MARKETS, NBAData, days_ahead=4)
+    update_bets_for_sport(db, client, fingerprints, **SPORT_CONFIGS['nba'], market_selector=market_selector)
 
-def update_ev_bets(sport=None):
+def update_ev_bets(sport=None, client: OddsApiClient = None, fingerprints: FingerprintCache = None,
+                   market_selector: MarketSelector = None):
     """
     Main function to fetch and update EV bets
     
     Args:
         sport (str): 'nfl', 'nba', or None for both
+        client (OddsApiClient): Odds API client to reuse; the process-wide client if None
+        fingerprints (FingerprintCache): Fingerprints from earlier cycles; if None every game is repriced
+        market_selector (MarketSelector): Learned market selection; every market is requested if None
     """
+    if client is None:
+        client = get_client()
+    if fingerprints is None:
+        fingerprints = FingerprintCache()
+    fingerprints.prune()
+    if client.budget is not None:
+        client.budget.start_cycle()
+    
     sport_name = sport.upper() if sport else "ALL"
     print(f"\n{'#'*50}")
     print(f"# Starting {sport_name} EV Bet Update")
@@ -135,15 +323,15 @@ def update_ev_bets(sport=None):
             # Deactivate bets based on sport parameter
             if sport == 'nfl':
                 db.deactivate_bets_for_sport('NFL')
-                update_nfl_bets(db)
+                update_nfl_bets(db, client, fingerprints, market_selector)
             elif sport == 'nba':
                 db.deactivate_bets_for_sport('NBA')
-                update_nba_bets(db)
+                update_nba_bets(db, client, fingerprints, market_selector)
             else:
                 # Update both sports - deactivate all
                 db.deactivate_all_bets()
-                update_nfl_bets(db)
-                update_nba_bets(db)
+                update_nfl_bets(db, client, fingerprints, market_selector)
+                update_nba_bets(db, client, fingerprints, market_selector)
             
             # Print statistics
             stats = db.get_bet_statistics()
@@ -156,6 +344,20 @@ def update_ev_bets(sport=None):
                 print(f"  Max EV: {stats['max_ev_percent']:.2f}%")
             print(f"{'='*50}\n")
         
+        timing = client.timing_summary()
+        print(f"Odds API requests since startup: {timing['request_count']} total, "
+              f"avg {timing['avg_seconds']:.3f}s, max {timing['max_seconds']:.3f}s, "
+              f"{timing['retry_count']} retries, {timing['throttled_count']} rate limited "
+              f"(limiter at {timing['rate_per_second']:.1f}/s)")
+        if client.budget is not None and client.budget.remaining is not None:
+            print(f"Odds API quota: {client.budget.remaining:.0f} remaining, "
+                  f"~{client.budget.cycle_cost:.0f} used this cycle, resets {client.budget.next_reset():%Y-%m-%d}")
+        if len(client.key_pool) > 1:
+            for usage in client.key_usage():
+                burn = f", {usage['used_per_hour']:.0f}/hour" if usage['used_per_hour'] is not None else ""
+                print(f"  key {usage['key']}: {usage['remaining'] if usage['remaining'] is not None else '?'} remaining, "
+                      f"{usage['requests']} requests{burn}{' (exhausted)' if usage['exhausted'] else ''}")
+        
         print(f"[{datetime.now()}] {sport_name} EV bet update completed successfully!\n")
         
     except Exception as e:
@@ -163,6 +365,260 @@ def update_ev_bets(sport=None):
         import traceback
         traceback.print_exc()
 
+def run_refresh_loop(sports: list[str], client: OddsApiClient, fingerprints: FingerprintCache,
+                     events_refresh_minutes: float = 15, queue: RefreshQueue = None,
+                     market_selector: MarketSelector = None, pricer: IncrementalPricer = None):
+    """
+    Keep EV bets fresh by refreshing each game on its own schedule
+    
+    Games are held in a priority queue keyed on when they are next due. Games close to
+    kickoff are refreshed every few minutes and distant games roughly hourly (see
+    refresh_queue.REFRESH_TIERS), so fetch and pricing work goes where lines move. The
+    events list for each sport is re-synced every events_refresh_minutes to pick up new
+    games and drop finished or removed ones.
+    
+    Args:
+        sports (list): Sports to run, e.g. ['nfl', 'nba']
+        client (OddsApiClient): Odds API client to reuse
+        fingerprints (FingerprintCache): Fingerprints of previously priced games
+        events_refresh_minutes (float): How often to re-sync each sport's events list
+        queue (RefreshQueue): Queue to use (a new one if None)
+        market_selector (MarketSelector): Learned market selection; every market is requested if None
+        pricer (IncrementalPricer): Incremental pricer to reuse (a new one if None)
+    """
+    if queue is None:
+        queue = RefreshQueue()
+    if pricer is None:
+        pricer = IncrementalPricer()
+    configs = {SPORT_CONFIGS[sport]['sport_key']: SPORT_CONFIGS[sport] for sport in sports}
+    sport_data = {}
+    next_sync = {sport_key: datetime.now(timezone.utc) for sport_key in configs}
+    
+    while True:
+        try:
+            now = datetime.now(timezone.utc)
+            
+            # Re-sync events lists that are due
+            for sport_key, config in configs.items():
+                if now < next_sync[sport_key]:
+                    continue
+                next_sync[sport_key] = now + timedelta(minutes=events_refresh_minutes)
+                
+                with Database() as db:
+                    events = get_upcoming_events(db, client, sport_key, config['sport_title'], config['days_ahead'])
+                    if events is None:
+                        continue
+                    
+                    removed = queue.sync(sport_key, events, now)
+                    for event_id in removed:
+                        db.deactivate_bets_for_game(event_id)
+                        pricer.forget(event_id)
+                    db.deactivate_commenced_bets()
+                
+                # Reload stats so daily stat updates are picked up
+                sport_data[sport_key] = config['data_class']()
+                fingerprints.prune()
+                pricer.prune()
+                print(f"[{datetime.now()}] {config['sport_title']}: tracking {len(events)} upcoming games")
+            
+            # Refresh every game that is due, nearest kickoff first
+            due = queue.pop_due(now)
+            if due:
+                # Steady-state markets per sport, for the quota estimate
+                markets = {sport_key: config['markets'] for sport_key, config in configs.items()}
+                if market_selector is not None:
+                    markets = {sport_key: market_selector.pruned(sport_key, sport_markets)
+                               for sport_key, sport_markets in markets.items()}
+                
+                stretch = 1.0
+                fetch = [event for _, event in due]
+                if client.budget is not None:
+                    costs = {
+                        sport_key: client.budget.cost_per_refresh(sport_markets, ODDS_SHARP_BOOKMAKERS,
+                                                                  ODDS_DFS_BOOKMAKERS, DFS_SNAPSHOT_REFRESHES)
+                        for sport_key, sport_markets in markets.items()
+                    }
+                    tracked = queue.spend_by_event(costs, now)
+                    stretch = client.budget.stretch_factor(sum(spend for _, spend in tracked))
+                    # Past the stretch cap, keep refreshing only the most valuable games
+                    fetch = client.budget.select_refresh_events(fetch, tracked)
+                fetch_ids = {event['id'] for event in fetch}
+                
+                failed = set()
+                try:
+                    with Database() as db:
+                        for sport_key, config in configs.items():
+                            # Events not yet fetched in full during a sweep get every market
+                            batches = {}
+                            for event_sport, event in due:
+                                if event_sport == sport_key and event['id'] in fetch_ids:
+                                    event_markets = config['markets'] if market_selector is None else \
+                                        market_selector.select(sport_key, config['markets'], event['id'])
+                                    batches.setdefault(event_markets, []).append(event)
+                            for batch_markets, batch in batches.items():
+                                print(f"\n[{datetime.now()}] Refreshing {len(batch)} {config['sport_title']} games")
+                                # Half a refresh of slack so the snapshot expires on the Nth refresh, not after it
+                                dfs_max_age = {
+                                    event['id']: (DFS_SNAPSHOT_REFRESHES - 0.5) * queue.interval_minutes(event, now) * stretch * 60
+                                    for event in batch
+                                }
+                                summary = price_events(db, client, fingerprints, sport_key, batch_markets,
+                                                       sport_data[sport_key], batch, refresh_per_game=True,
+                                                       market_selector=market_selector, pricer=pricer,
+                                                       dfs_max_age=dfs_max_age)
+                                failed.update(summary['failed_ids'])
+                                print(f"{config['sport_title']}: {summary['priced']} repriced, {summary['unchanged']} unchanged, "
+                                      f"{summary['failed']} failed, {summary['ev_bets']} EV bets")
+                finally:
+                    # Always put refreshed games back on the queue; games that failed are retried soon
+                    refreshed_at = datetime.now(timezone.utc)
+                    for _, event in due:
+                        if event['id'] in failed:
+                            queue.requeue(event['id'], refreshed_at)
+                        else:
+                            queue.schedule_next(event['id'], refreshed_at, stretch)
+                
+                next_due = queue.next_due()
+                if next_due is not None:
+                    print(f"Next refresh at {next_due:%H:%M:%S} UTC"
+                          + (f" (intervals stretched x{stretch:.2f} to save quota)" if stretch > 1 else ""))
+        
+        except Exception as e:
+            print(f"Error in refresh loop: {e}")
+            import traceback
+            traceback.print_exc()
+        
+        # Sleep until the next game is due or an events list needs re-syncing
+        wake_times = list(next_sync.values())
+        next_due = queue.next_due()
+        if next_due is not None:
+            wake_times.append(next_due)
+        seconds = (min(wake_times) - datetime.now(timezone.utc)).total_seconds()
+        time.sleep(min(max(seconds, 1), 20))
+
+def replay_archive(archive_dir: str, sports: list[str], speed: float = 0.0, use_db: bool = True):
+    """
+    Run the get_game -> find_plus_ev -> insert_ev_bets pipeline over archived odds responses
+    
+    Responses are replayed in the order they were fetched. Split refreshes are merged the
+    way they were live: each DFS snapshot is held per event and combined with every later
+    sharp response for that event. With speed > 0 the original gaps
+    between fetches are reproduced, divided by speed (2.0 = twice as fast as recorded);
+    with speed == 0 responses are replayed as fast as possible. No Odds API quota is used,
+    so this gives a repeatable benchmark of the pricing and persistence path.
+    
+    Bets are written to the database at DATABASE_URL, including bets for games that have
+    since commenced, which are deactivated again once the replay finishes.
+    
+    Args:
+        archive_dir (str): Directory written by odds_archive.ArchiveWriter
+        sports (list): Sports to replay, e.g. ['nfl', 'nba']
+        speed (float): Replay speed factor, 0 for as fast as possible
+        use_db (bool): If False, skip persistence and only benchmark pricing
+    
+    Returns:
+        dict: Replay timing summary
+    """
+    reader = ArchiveReader(archive_dir)
+    configs = {SPORT_CONFIGS[sport]['sport_key']: SPORT_CONFIGS[sport] for sport in sports}
+    entries = [
+        entry for entry in reader.entries()
+        if entry['sport'] in configs and entry['kind'] in ('odds', 'odds_sharp', 'odds_dfs')
+    ]
+    
+    print(f"Replaying {len(entries)} archived odds responses from {archive_dir} "
+          f"({'as fast as possible' if speed <= 0 else f'{speed}x speed'})")
+    
+    timings = {'load': 0.0, 'build': 0.0, 'price': 0.0, 'persist': 0.0}
+    summary = {'games': 0, 'ev_bets': 0}
+    sport_data = {}
+    dfs_snapshots = {}
+    
+    db = Database() if use_db else None
+    try:
+        replay_start = time.perf_counter()
+        first_fetch = None
+        
+        for entry in entries:
+            fetch_time = datetime.fromisoformat(entry['fetch_time'].replace('Z', '+00:00'))
+            if first_fetch is None:
+                first_fetch = fetch_time
+            
+            # Reproduce the recorded spacing between fetches
+            if speed > 0:
+                target = (fetch_time - first_fetch).total_seconds() / speed
+                delay = target - (time.perf_counter() - replay_start)
+                if delay > 0:
+                    time.sleep(delay)
+            
+            config = configs[entry['sport']]
+            if entry['sport'] not in sport_data:
+                sport_data[entry['sport']] = config['data_class']()
+            
+            try:
+                step = time.perf_counter()
+                odds_json = reader.load(entry)
+                timings['load'] += time.perf_counter() - step
+                
+                if entry['kind'] == 'odds_dfs':
+                    dfs_snapshots[entry['event_id']] = odds_json['bookmakers']
+                    continue
+                if entry['kind'] == 'odds_sharp':
+                    if entry['event_id'] not in dfs_snapshots:
+                        continue
+                    odds_json = {**odds_json, 'bookmakers': dfs_snapshots[entry['event_id']] + odds_json['bookmakers']}
+                
+                step = time.perf_counter()
+                game = game_from_odds_json(odds_json, config['markets'], ODDS_BOOKMAKERS, sport_data[entry['sport']])
+                timings['build'] += time.perf_counter() - step
+                if game is None:
+                    continue
+                
+                step = time.perf_counter()
+                ev_bets = game.find_plus_ev(BETTING_BOOKS, SHARP_BOOKS, -5)
+                timings['price'] += time.perf_counter() - step
+                
+                if db is not None:
+                    step = time.perf_counter()
+                    db.insert_game({
+                        'id': game.id,
+                        'sport_key': game.sport_key,
+                        'sport_title': game.sport_title,
+                        'commence_time': game.commence_time,
+                        'home_team': game.home_team,
+                        'away_team': game.away_team
+                    })
+                    db.deactivate_bets_for_game(game.id)
+                    db.insert_ev_bets(ev_bets, game.id, skip_commenced=False)
+                    timings['persist'] += time.perf_counter() - step
+                
+                summary['games'] += 1
+                summary['ev_bets'] += len(ev_bets)
+                
+            except Exception as e:
+                print(f"Error replaying {entry['sport']} event {entry['event_id']} at {entry['fetch_time']}: {e}")
+                continue
+        
+        elapsed = time.perf_counter() - replay_start
+        if db is not None:
+            db.deactivate_commenced_bets()
+    finally:
+        if db is not None:
+            db.close()
+    
+    summary.update({f'{name}_seconds': seconds for name, seconds in timings.items()})
+    summary['elapsed_seconds'] = elapsed
+    summary['games_per_second'] = summary['games'] / elapsed if elapsed > 0 else 0.0
+    
+    print(f"\n{'='*50}")
+    print(f"Replay complete: {summary['games']} games, {summary['ev_bets']} EV bets in {elapsed:.2f}s "
+          f"({summary['games_per_second']:.2f} games/s)")
+    for name, seconds in timings.items():
+        print(f"  {name:<8} {seconds:8.2f}s  ({seconds / summary['games'] * 1000 if summary['games'] else 0:.1f} ms/game)")
+    print(f"{'='*50}\n")
+    
+    return summary
+
 def check_and_initialize_database():
     """Check if database is initialized, and initialize if needed"""
     try:
@@ -204,7 +660,65 @@ if __name__ == "__main__":
         default='both',
         help='Which sport to update: nfl, nba, or both (default: both)'
     )
+    parser.add_argument(
+        '--once',
+        action='store_true',
+        help='Run a single full update of every game and exit'
+    )
+    parser.add_argument(
+        '--replay',
+        type=str,
+        metavar='ARCHIVE_DIR',
+        help='Replay archived odds responses through the pricing pipeline instead of calling the Odds API'
+    )
+    parser.add_argument(
+        '--speed',
+        type=float,
+        default=0.0,
+        help='Replay speed factor relative to the recorded fetch times; 0 = as fast as possible (default: 0)'
+    )
+    parser.add_argument(
+        '--no-db',
+        action='store_true',
+        help='With --replay, skip writing bets to the database'
+    )
+    parser.add_argument(
+        '--devig',
+        type=str,
+        choices=devig.DEVIG_METHODS,
+        default=devig.DEVIG_METHOD,
+        help=f'Method used to remove the bookmaker margin from sharp odds (default: {devig.DEVIG_METHOD})'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=parallel_ev.PRICING_WORKERS,
+        help=f'Worker processes used to price each slate; 0 or 1 prices in-process (default: {parallel_ev.PRICING_WORKERS})'
+    )
+    parser.add_argument(
+        '--pricing-log-level',
+        type=str.upper,
+        choices=pricing_log.PRICING_LOG_LEVELS,
+        default=pricing_log.PRICING_LOG_LEVEL,
+        help=f'Pricing diagnostics: DEBUG lists affected players, INFO logs one summary per game, '
+             f'WARNING keeps pricing quiet (default: {pricing_log.PRICING_LOG_LEVEL})'
+    )
     args = parser.parse_args()
+    devig.set_default_method(args.devig)
+    parallel_ev.set_default_workers(args.workers)
+    pricing_log.set_level(args.pricing_log_level)
+    
+    # Determine which sport(s) to run
+    sport_param = None if args.sport == 'both' else args.sport
+    sport_display = args.sport.upper()
+    sports = list(SPORT_CONFIGS) if sport_param is None else [sport_param]
+    
+    if args.replay:
+        if not args.no_db and not os.getenv('DATABASE_URL'):
+            print("ERROR: DATABASE_URL environment variable is not set (use --no-db to skip persistence)")
+            exit(1)
+        replay_archive(args.replay, sports, speed=args.speed, use_db=not args.no_db)
+        exit(0)
     
     # Check if DATABASE_URL is set
     if not os.getenv('DATABASE_URL'):
@@ -213,18 +727,14 @@ if __name__ == "__main__":
         exit(1)
     
     # Check if API_KEY is set
-    if not os.getenv('API_KEY'):
-        print("ERROR: API_KEY environment variable is not set!")
+    if not os.getenv('API_KEY') and not os.getenv('API_KEYS'):
+        print("ERROR: API_KEY (or API_KEYS) environment variable is not set!")
         print("Please set it in your .env file or Railway environment variables")
         exit(1)
     
-    # Get update interval from environment variable (default to 15 minutes)
+    # Get events list refresh interval from environment variable (default to 15 minutes)
     update_interval = int(os.getenv('UPDATE_INTERVAL_MINUTES', '15'))
     
-    # Determine which sport(s) to run
-    sport_param = None if args.sport == 'both' else args.sport
-    sport_display = args.sport.upper()
-    
     print("="*50)
     print(f"EV Bet Scheduler Starting ({sport_display})...")
     print("="*50)
@@ -234,16 +744,30 @@ if __name__ == "__main__":
         print("\nERROR: Could not initialize database. Exiting.")
         exit(1)
     
-    # Run immediately on startup
-    update_ev_bets(sport=sport_param)
+    # One pooled Odds API client for the lifetime of the process
+    budget = QuotaBudget()
+    archive = ArchiveWriter(ODDS_ARCHIVE_DIR) if ODDS_ARCHIVE_DIR else None
+    if archive is not None:
+        print(f"Archiving raw Odds API responses to {ODDS_ARCHIVE_DIR} ({archive.codec})")
+    client = OddsApiClient(budget=budget, archive=archive)
+    fingerprints = FingerprintCache()
+    market_selector = MarketSelector()
     
-    # Schedule to run at the specified interval
-    schedule.every(update_interval).minutes.do(update_ev_bets, sport=sport_param)
+    if args.once:
+        update_ev_bets(sport=sport_param, client=client, fingerprints=fingerprints, market_selector=market_selector)
+        parallel_ev.shutdown_pool()
+        if archive is not None:
+            archive.close()
+        exit(0)
     
-    print(f"\nScheduler active ({sport_display}). Updates will run every {update_interval} minutes.")
+    print(f"\nScheduler active ({sport_display}). Games refresh on a time-to-kickoff schedule; "
+          f"events lists re-sync every {update_interval} minutes.")
     print("Press Ctrl+C to stop.\n")
     
-    while True:
-        schedule.run_pending()
-        time.sleep(20)
-
+    try:
+        run_refresh_loop(sports, client, fingerprints, events_refresh_minutes=update_interval,
+                         market_selector=market_selector)
+    finally:
+        parallel_ev.shutdown_pool()
+        if archive is not None:
+            archive.close()
@@ -0,0 +1,356 @@
+import logging
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+import devig
+import pricing_math
+import pricing_log
+from pricing_log import logger
+from odds_layout import CATEGORICAL_COLUMNS, widen
+
+RESULT_COLUMNS = [
+    'bookmaker', 'sport_key', 'market', 'player', 'outcome',
+    'betting_line', 'sharp_mean', 'implied_means', 'std_dev',
+    'sample_size', 'mean_diff', 'ev_percent', 'price', 'true_prob',
+    'home_team', 'away_team', 'commence_time'
+]
+
+
+def _slate_odds(games: list) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Concatenate every game's odds_df into one frame.
+
+    The slate shares one dictionary per categorical column so keys can be compared as
+    integer codes. Games decoded with the same OddsDictionary already use slate-wide
+    codes and are stitched together directly; otherwise the categoricals are unioned.
+
+    Returns:
+        tuple: (odds, game_index, shared) where game_index[i] is the position in `games` of
+               row i and shared is whether the games' codes were already slate-wide
+    """
+    frames = [game.odds_df for game in games]
+    odds = pd.concat([frame.drop(columns=list(CATEGORICAL_COLUMNS)) for frame in frames], ignore_index=True)
+    dictionary = games[0].odds_dictionary
+    shared = dictionary is not None and all(game.odds_dictionary is dictionary for game in games)
+    for column in CATEGORICAL_COLUMNS:
+        if shared:
+            odds[column] = pd.Categorical.from_codes(
+                np.concatenate([frame[column].cat.codes.to_numpy() for frame in frames]), dtype=dictionary.dtype(column)
+            )
+        else:
+            odds[column] = union_categoricals([frame[column] for frame in frames])
+    game_index = np.repeat(np.arange(len(games), dtype=np.int64), [len(frame) for frame in frames])
+    return odds, game_index, shared
+
+
+def _group_keys(game_index: np.ndarray, players: np.ndarray, markets: np.ndarray,
+                n_players: int, n_markets: int) -> np.ndarray:
+    """One int64 key per (game, player, market)."""
+    return (game_index * n_players + players) * n_markets + markets
+
+
+def _std_dev_lookup(games: list, keys: np.ndarray, player_categories, market_categories,
+                    n_players: int, n_markets: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    std_dev and sample_size for each unique (game, player, market) key, looked up in
+    each game's sport_data.
+    """
+    std_dev = np.empty(len(keys), dtype=np.float64)
+    sample_size = np.empty(len(keys), dtype=np.int64)
+    market_codes = keys % n_markets
+    player_codes = (keys // n_markets) % n_players
+    game_codes = keys // (n_markets * n_players)
+    for i, (game_code, player_code, market_code) in enumerate(zip(game_codes, player_codes, market_codes)):
+        std_dev[i], sample_size[i] = games[game_code].sport_data.get_std_dev(
+            player_categories[player_code], market_categories[market_code]
+        )
+    return std_dev, sample_size
+
+
+def _sharp_aggregates(keys: np.ndarray, books: np.ndarray, implied_mean: np.ndarray) -> tuple:
+    """
+    Mean implied mean per (game, player, market) key, with each book's implied mean.
+
+    Returns:
+        tuple: (agg_keys, sharp_mean_by_key, implied_means_by_key), agg_keys sorted
+    """
+    sharp_means = pd.Series(implied_mean).groupby(keys).mean()
+    agg_keys = sharp_means.index.to_numpy()
+    order = np.argsort(keys, kind='stable')
+    bounds = np.searchsorted(keys[order], agg_keys, side='left').tolist() + [len(order)]
+    implied_means_by_key = np.empty(len(agg_keys), dtype=object)
+    for i in range(len(agg_keys)):
+        rows = order[bounds[i]:bounds[i + 1]]
+        implied_means_by_key[i] = [
+            {'bookmaker': b, 'implied_mean': m}
+            for b, m in zip(books[rows].tolist(), implied_mean[rows].tolist())
+        ]
+    return agg_keys, sharp_means.to_numpy(), implied_means_by_key
+
+
+def _true_probabilities(merged: pd.DataFrame, merged_keys: np.ndarray) -> np.ndarray:
+    """
+    Normal distribution where std dev is valid, mean comparison otherwise.
+
+    DFS books mostly post the same lines, so each distinct (game, player, market, line,
+    outcome) is priced once and fanned out to every book's row.
+    """
+    line_ids, line_count = devig.group_ids(merged_keys, merged['line'], merged['outcome'])
+    first_rows = np.unique(line_ids, return_index=True)[1]
+    line = merged['line'].to_numpy()[first_rows]
+    sharp_mean = merged['sharp_mean'].to_numpy()[first_rows]
+    std_dev = merged['std_dev'].to_numpy()[first_rows]
+    outcome = merged['outcome'].to_numpy()[first_rows]
+    is_over = outcome == 'Over'
+    is_under = outcome == 'Under'
+    valid_std = (std_dev > 0) & ~np.isnan(std_dev)
+
+    true_prob = np.full(line_count, np.nan)
+    over = valid_std & is_over
+    under = valid_std & is_under
+    if over.any():
+        true_prob[over] = pricing_math.over_probability(line[over], sharp_mean[over], std_dev[over])
+    if under.any():
+        true_prob[under] = pricing_math.under_probability(line[under], sharp_mean[under], std_dev[under])
+    over = ~valid_std & is_over
+    under = ~valid_std & is_under
+    true_prob[over] = (sharp_mean[over] > line[over]).astype(float)
+    true_prob[under] = (sharp_mean[under] < line[under]).astype(float)
+    return true_prob[line_ids]
+
+
+def _split_by_game(games: list, merged: pd.DataFrame, merged_games: np.ndarray, keep: np.ndarray,
+                   shared: bool, results: dict) -> None:
+    """File the kept rows under each game's id, formatted as find_plus_ev returns them."""
+    kept = merged[keep].rename(columns={'line': 'betting_line'})
+    kept_games = merged_games[keep]
+    starts = np.searchsorted(kept_games, np.arange(len(games)), side='left')
+    ends = np.searchsorted(kept_games, np.arange(len(games)), side='right')
+    columns = {
+        column: kept[column].cat.codes.to_numpy() if column in CATEGORICAL_COLUMNS else kept[column].to_numpy()
+        for column in RESULT_COLUMNS if column in kept
+    }
+    for game_code, game in enumerate(games):
+        start, end = starts[game_code], ends[game_code]
+        if start == end:
+            continue
+
+        data = {}
+        for column in RESULT_COLUMNS:
+            if column in CATEGORICAL_COLUMNS:
+                # Back to the game's own categories, as its odds_df has them (with a shared
+                # dictionary those are a prefix of the slate's, so the codes carry over)
+                dtype = game.odds_df[column].dtype
+                codes = columns[column][start:end]
+                if not shared:
+                    codes = dtype.categories.get_indexer(kept[column].cat.categories)[codes]
+                data[column] = pd.Categorical.from_codes(codes, dtype=dtype)
+            elif column in columns:
+                data[column] = columns[column][start:end]
+            else:
+                data[column] = getattr(game, column)
+        result_df = pd.DataFrame(data, index=kept.index[start:end])
+        results[game.id] = result_df.sort_values('ev_percent', ascending=False)
+
+
+def _log_game_summaries(games: list, priced, betting_books: list[str], sharp_books: list[str], threshold: float) -> None:
+    """One summary record per game, with the same counters as find_plus_ev."""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    counts = {name: np.zeros(len(games), dtype=np.int64) for name in ('matched', 'fallback_std', 'low_sample', 'ev_bets')}
+    if priced is not None:
+        merged, merged_games, keep = priced
+        std_dev = merged['std_dev'].to_numpy()
+        counts['matched'] = np.bincount(merged_games, minlength=len(games))
+        counts['fallback_std'] = np.bincount(merged_games[~(std_dev > 0) | np.isnan(std_dev)], minlength=len(games))
+        counts['low_sample'] = np.bincount(merged_games[merged['sample_size'].to_numpy() <= 1], minlength=len(games))
+        counts['ev_bets'] = np.bincount(merged_games[keep], minlength=len(games))
+
+    for i, game in enumerate(games):
+        odds = game.odds_df
+        sharp = odds['bookmaker'].isin(sharp_books).to_numpy()
+        counters = pricing_log.new_counters()
+        counters.update({name: int(values[i]) for name, values in counts.items()})
+        counters['betting_lines'] = int(odds['bookmaker'].isin(betting_books).sum())
+        counters['sharp_lines'] = int(sharp.sum())
+        counters['half_prob'] = int((sharp & (odds['outcome'] == 'Over').to_numpy() & (odds['devigged_prob'].to_numpy() == 0.5)).sum())
+        counters['unmatched'] = counters['betting_lines'] - counters['matched']
+        pricing_log.log_game_summary(game, counters, threshold)
+
+
+def _price_configs(games: list, configs: list[tuple]) -> tuple[list, bool, list]:
+    """
+    Price a slate under one or more (betting_books, sharp_books, threshold) configs.
+
+    The slate frame, std dev lookups (for every config's betting player/markets) and
+    sharp implied means are computed once; sharp means are aggregated once per distinct
+    sharp_books, matching and probabilities once per distinct (betting_books,
+    sharp_books), and only the threshold filter runs per config.
+
+    Returns:
+        tuple: (games, shared, priced) where games are the games with odds, shared is
+               whether their codes are slate-wide and priced[i] is (merged, merged_games,
+               keep) for configs[i], or None if it matched no betting lines
+    """
+    priced_configs = [None] * len(configs)
+    games = [game for game in games if len(game.odds_df) > 0]
+    if not games or not configs:
+        return games, False, priced_configs
+
+    odds, game_index, shared = _slate_odds(games)
+    player_categories = odds['player'].cat.categories
+    market_categories = odds['market'].cat.categories
+    n_players = max(len(player_categories), 1)
+    n_markets = max(len(market_categories), 1)
+    keys = _group_keys(game_index, odds['player'].cat.codes.to_numpy(np.int64),
+                       odds['market'].cat.codes.to_numpy(np.int64), n_players, n_markets)
+
+    bookmakers = odds['bookmaker']
+    is_over = (odds['outcome'] == 'Over').to_numpy()
+    book_masks = {}
+
+    def books_mask(books) -> np.ndarray:
+        books = tuple(books)
+        if books not in book_masks:
+            book_masks[books] = bookmakers.isin(books).to_numpy()
+        return book_masks[books]
+
+    # std dev lookups for every config's betting player/markets; sharp lines for anything
+    # else can never match a betting line, so they are dropped here
+    betting_masks = {tuple(betting_books): books_mask(betting_books) for betting_books, _, _ in configs}
+    betting_keys = np.unique(keys[np.logical_or.reduce(list(betting_masks.values()))])
+    sharp_over_mask = np.logical_or.reduce([books_mask(sharp_books) for _, sharp_books, _ in configs])
+    sharp_over_mask = sharp_over_mask & is_over & np.isin(keys, betting_keys)
+    if len(betting_keys) == 0 or not sharp_over_mask.any():
+        return games, shared, priced_configs
+
+    std_by_key, samples_by_key = _std_dev_lookup(games, betting_keys, player_categories, market_categories, n_players, n_markets)
+    logger.debug(f"Looked up std dev for {len(betting_keys)} player/market combinations across {len(games)} games")
+
+    # Implied mean of every sharp Over line: μ = L - σ * Φ^(-1)(1 - p_over)
+    sharp_rows = np.flatnonzero(sharp_over_mask)
+    sharp_keys = keys[sharp_rows]
+    sharp_std = std_by_key[np.searchsorted(betting_keys, sharp_keys)]
+    sharp_line = widen(odds['line'].to_numpy()[sharp_rows])
+    sharp_prob = odds['devigged_prob'].to_numpy()[sharp_rows]
+    implied_mean = sharp_line.copy()
+    calc_mask = (sharp_std > 0) & ~np.isnan(sharp_std) & (sharp_prob != 0.5)
+    if calc_mask.any():
+        implied_mean[calc_mask] = pricing_math.implied_mean(sharp_line[calc_mask], sharp_std[calc_mask], sharp_prob[calc_mask])
+    sharp_books_by_row = bookmakers.to_numpy()[sharp_rows].astype(object)
+
+    aggregates = {}
+    priced = {}
+    for config_index, (betting_books, sharp_books, threshold) in enumerate(configs):
+        setup = (tuple(betting_books), tuple(sharp_books))
+        if setup not in priced:
+            priced[setup] = None
+            betting_mask = betting_masks[setup[0]]
+            config_keys = np.unique(keys[betting_mask])
+
+            # Aggregate per (game, player, market) over this config's sharp books, keeping
+            # each book's implied mean
+            if setup[1] not in aggregates:
+                in_books = books_mask(sharp_books)[sharp_rows]
+                aggregates[setup[1]] = (in_books, _sharp_aggregates(
+                    sharp_keys[in_books], sharp_books_by_row[in_books], implied_mean[in_books]
+                ))
+            in_books, (agg_keys, sharp_mean_by_key, implied_means_by_key) = aggregates[setup[1]]
+            if not (in_books & np.isin(sharp_keys, config_keys)).any():
+                continue
+
+            # Betting lines with sharp data, in slate order
+            betting_rows = np.flatnonzero(betting_mask)
+            matched_rows = betting_rows[np.isin(keys[betting_rows], agg_keys)]
+            if len(matched_rows) == 0:
+                continue
+            merged = odds.iloc[matched_rows].reset_index(drop=True)
+            merged['line'] = widen(merged['line'].to_numpy())
+            merged['price'] = widen(merged['price'].to_numpy())
+            merged_keys = keys[matched_rows]
+            lookup = np.searchsorted(betting_keys, merged_keys)
+            agg_lookup = np.searchsorted(agg_keys, merged_keys)
+            merged['std_dev'] = std_by_key[lookup]
+            merged['sample_size'] = samples_by_key[lookup]
+            merged['sharp_mean'] = sharp_mean_by_key[agg_lookup]
+            merged['implied_means'] = implied_means_by_key[agg_lookup]
+            merged['true_prob'] = _true_probabilities(merged, merged_keys)
+
+            merged['ev_percent'] = ((merged['true_prob'] * merged['price']) - 1) * 100
+            merged['mean_diff'] = merged['line'] - merged['sharp_mean']
+
+            # Each game's rows are indexed by their position among that game's matched lines,
+            # as find_plus_ev's merge would leave them
+            merged_games = game_index[matched_rows]
+            merged.index = pd.RangeIndex(len(merged)) - np.searchsorted(merged_games, merged_games, side='left')
+            priced[setup] = (merged, merged_games)
+
+        if priced[setup] is None:
+            continue
+        merged, merged_games = priced[setup]
+        keep = ((merged['ev_percent'] >= threshold) & (merged['sample_size'] > 1)).to_numpy()
+        priced_configs[config_index] = (merged, merged_games, keep)
+
+    return games, shared, priced_configs
+
+
+def find_plus_ev_slate(games: list, betting_books: list[str], sharp_books: list[str], threshold: float = 0.0) -> dict:
+    """
+    Find EV bets for a whole slate of games in one vectorized pass.
+
+    Every game's odds are concatenated into one frame keyed by game, then std dev
+    enrichment, sharp mean aggregation and probability/EV are computed once for the
+    slate instead of once per game. Odds are devigged when each Game is built.
+
+    The result for each game is identical to game.find_plus_ev(betting_books,
+    sharp_books, threshold): same rows, order, index, values and dtypes.
+
+    Args:
+        games: Game objects to price (each with its own sport_data)
+        betting_books: Bookmakers user is betting on
+        sharp_books: Bookmakers to use for sharp odds
+        threshold: Minimum EV percentage to include in results
+
+    Returns:
+        dict: Mapping of game id -> EV bets DataFrame (empty if the game has none), in the order of games
+    """
+    results = {game.id: pd.DataFrame() for game in games}
+    games, shared, priced = _price_configs(games, [(betting_books, sharp_books, threshold)])
+    if priced[0] is not None:
+        _split_by_game(games, *priced[0], shared, results)
+    _log_game_summaries(games, priced[0], betting_books, sharp_books, threshold)
+    return results
+
+
+def find_plus_ev_configs(games: list, configs: list[tuple]) -> list[pd.DataFrame]:
+    """
+    Find EV bets for a slate under several book setups (e.g. fanduel-only sharps versus
+    fanduel + draftkings, or different thresholds) in one pass.
+
+    Everything the configs have in common is computed once (see _price_configs), so the
+    cost stays close to a single find_plus_ev_slate call.
+
+    Args:
+        games: Game objects to price (each with its own sport_data)
+        configs: (betting_books, sharp_books, threshold) tuples
+
+    Returns:
+        list: One DataFrame per config with every game's EV bets (columns as find_plus_ev
+              returns them), sorted by EV percentage; empty if the config found none
+    """
+    results = []
+    games, _, priced = _price_configs(games, configs)
+    for (betting_books, sharp_books, threshold), config in zip(configs, priced):
+        matched, ev_bets = (0, 0) if config is None else (len(config[0]), int(config[2].sum()))
+        logger.info(f"Betting {betting_books} against {sharp_books} (>= {threshold}%): {matched} betting lines "
+                    f"matched with sharp data, {ev_bets} EV bets across {len(games)} games")
+        if ev_bets == 0:
+            results.append(pd.DataFrame())
+            continue
+        merged, merged_games, keep = config
+        result_df = merged[keep].rename(columns={'line': 'betting_line'})
+        kept_games = merged_games[keep]
+        for column in ('sport_key', 'home_team', 'away_team', 'commence_time'):
+            result_df[column] = np.array([getattr(game, column) for game in games], dtype=object)[kept_games]
+        results.append(result_df[RESULT_COLUMNS].sort_values('ev_percent', ascending=False).reset_index(drop=True))
+    return results